@@ -0,0 +1,213 @@
+"""Render many configurations at once, across a pool of processes.
+
+Configurations are grouped by source constant: each `.dat` file is read once, its
+digits (covering all the configurations of the group) copied into a shared memory
+block, and each worker process renders its configurations straight from this block
+instead of receiving a pickled copy of the digits.
+
+Run with (from the `colourful-constants` folder, the path to the constants being
+relative):
+
+```bash
+$ .venv/bin/python code/batch.py configs/*.yaml
+```
+
+Each `configs/<name>.yaml` is rendered to `outputs/<name>.svg` (or `.png`, depending on
+the `mode` option), and a per-configuration timing summary is printed at the end.
+"""
+
+import concurrent.futures
+import multiprocessing.shared_memory
+import os
+import sys
+import time
+import typing
+
+import numpy as np
+
+import svg
+
+
+def render_shared(
+    config: typing.Dict[str, typing.Any],
+    output: str,
+    name: str,
+    size: int,
+    offset: int,
+) -> float:
+    """Render a configuration from digits stored in a shared memory block.
+
+    Parameters
+    ----------
+    config : typing.Dict[str, typing.Any]
+        Dictionary of the configuration options.
+    output : str
+        Filepath to write the plot to.
+    name : str
+        Name of the shared memory block holding the digits.
+    size : int
+        Number of digits in the shared memory block.
+    offset : int
+        Position of the first digit of this configuration in the shared memory block.
+
+    Returns
+    -------
+    : float
+        Rendering time, in seconds.
+
+    Raises
+    ------
+    RuntimeError
+        If the rendering failed, with the message of the original error.
+    """
+    t = time.perf_counter()
+
+    shm = multiprocessing.shared_memory.SharedMemory(name=name)
+    digits = np.ndarray((size,), dtype=np.uint8, buffer=shm.buf)
+    data = config["plot"]["data"]
+    error = None
+
+    try:
+        with open(output, "wb") as f:
+            svg.render_config(
+                f, config, digits[offset : offset + data["until"] - data["first"]]
+            )
+    except Exception as e:
+        # its traceback holds views on the block: only keep the message
+        error = f"{type(e).__name__}: {e}"
+
+    # no view on the block can outlive it
+    del digits
+    shm.close()
+
+    if error is not None:
+        # no partial plot left behind
+        if os.path.exists(output):
+            os.remove(output)
+        raise RuntimeError(error)
+
+    return time.perf_counter() - t
+
+
+def render_batch(
+    sources: typing.List[str], folder: str = "outputs", processes: int = None
+) -> typing.List[typing.Tuple[str, int, typing.Optional[float], typing.Optional[str]]]:
+    """Render configurations in parallel, sharing the digits of each constant.
+
+    A configuration failing (to load or to render) does not stop the others: it is
+    reported with its error instead of its rendering time.
+
+    Parameters
+    ----------
+    sources : typing.List[str]
+        Filepaths to the configurations to render.
+    folder : str
+        Path to the folder to write the plots in. Defaults to `outputs`.
+    processes : int
+        Number of worker processes. Defaults to `None` (number of processors).
+
+    Returns
+    -------
+    : typing.List[typing.Tuple[str, int, typing.Optional[float], typing.Optional[str]]]
+        Filepath, number of digits, rendering time (in seconds, `None` if failed) and
+        error message (`None` if rendered) of each configuration, in the input order.
+    """
+    os.makedirs(folder, exist_ok=True)
+
+    timings: typing.List[typing.Any] = [None] * len(sources)
+
+    # group the (valid) configurations by constant
+    groups: typing.Dict[str, typing.List[typing.Tuple[int, str, typing.Dict]]] = {}
+    for i, source in enumerate(sources):
+        try:
+            config = svg.fetch_config(source)
+            svg.check_config(config)
+        except Exception as e:
+            timings[i] = (source, 0, None, f"{type(e).__name__}: {e}")
+            continue
+
+        groups.setdefault(config["plot"]["data"]["source"], []).append(
+            (i, source, config)
+        )
+
+    blocks, futures = [], {}
+
+    with concurrent.futures.ProcessPoolExecutor(processes) as executor:
+        try:
+            for constant, configs in groups.items():
+                first = min(c["plot"]["data"]["first"] for _, _, c in configs)
+                until = max(c["plot"]["data"]["until"] for _, _, c in configs)
+
+                try:
+                    digits = svg.fetch_digits(constant, first, until)
+                except Exception as e:
+                    for i, source, config in configs:
+                        data = config["plot"]["data"]
+                        timings[i] = (
+                            source,
+                            data["until"] - data["first"],
+                            None,
+                            f"{type(e).__name__}: {e}",
+                        )
+                    continue
+
+                shm = multiprocessing.shared_memory.SharedMemory(
+                    create=True, size=max(1, digits.nbytes)
+                )
+                blocks.append(shm)
+                np.ndarray(digits.shape, dtype=np.uint8, buffer=shm.buf)[:] = digits
+
+                for i, source, config in configs:
+                    data = config["plot"]["data"]
+                    mode = config["plot"].get("format", {}).get("mode", "line")
+                    output = os.path.join(
+                        folder,
+                        os.path.splitext(os.path.basename(source))[0]
+                        + (".png" if mode == "png" else ".svg"),
+                    )
+
+                    futures[i] = executor.submit(
+                        render_shared,
+                        config,
+                        output,
+                        shm.name,
+                        digits.shape[0],
+                        data["first"] - first,
+                    )
+                    timings[i] = (source, data["until"] - data["first"], None, None)
+
+            for i, future in futures.items():
+                source, count, _, _ = timings[i]
+                try:
+                    timings[i] = (source, count, future.result(), None)
+                except Exception as e:
+                    timings[i] = (source, count, None, str(e))
+
+        finally:
+            # no worker may still be reading from a block when it goes away
+            executor.shutdown(wait=True, cancel_futures=True)
+            for shm in blocks:
+                shm.close()
+                shm.unlink()
+
+    return timings
+
+
+if __name__ == "__main__":
+    t = time.perf_counter()
+    timings = render_batch(sys.argv[1:])
+    t = time.perf_counter() - t
+
+    failed = 0
+    for source, count, seconds, error in timings:
+        if error is None:
+            sys.stdout.write(f"{source:40s} {count:>12,d} digits {seconds:8.3f}s\n")
+        else:
+            failed += 1
+            sys.stdout.write(f"{source:40s} {count:>12,d} digits   FAILED {error}\n")
+    sys.stdout.write(
+        f"{len(timings)} configurations ({failed} failed) in {t:.3f}s "
+        f"({sum(s for _, _, s, _ in timings if s is not None):.3f}s of rendering)\n"
+    )
+
+    sys.exit(1 if failed else 0)
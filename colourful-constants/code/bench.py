@@ -0,0 +1,214 @@
+"""Quick benchmarks of the different steps of the random walk drawing.
+
+Run with (from the `colourful-constants` folder, the path to the constants being
+relative):
+
+```bash
+$ .venv/bin/python code/bench.py
+```
+
+Attributes
+----------
+sizes : typing.List[int]
+    Number of digits to benchmark against.
+"""
+
+import io
+import os
+import sys
+import time
+import typing
+
+import numpy as np
+
+import raster
+import svg
+
+sizes: typing.List[int] = [1_000, 100_000, 1_000_000]
+
+
+def _timeit(func: typing.Callable, *args, repeat: int = 3, **kwargs) -> float:
+    """Time the best of a few runs of a function.
+
+    Parameters
+    ----------
+    func : typing.Callable
+        Function to time.
+    repeat : int
+        Number of runs. Defaults to `3`.
+
+    Returns
+    -------
+    : float
+        Shortest run time, in seconds.
+    """
+    best = float("inf")
+
+    for _ in range(repeat):
+        t = time.perf_counter()
+        func(*args, **kwargs)
+        best = min(best, time.perf_counter() - t)
+
+    return best
+
+
+def compute_coordinates_loop(
+    digits: np.array, angle_step: float = 36.0, recenter: bool = True
+) -> np.array:
+    """Reference (original) step-by-step implementation of the walk.
+
+    Parameters
+    ----------
+    digits : numpy.array
+        `NumPy` array of the decimal digits.
+    angle_step : float
+        Angle in between two digits. Defaults to `36.0`.
+    recenter : bool
+        Recenter the plot to avoid negative coordinates. Defaults to `True`.
+
+    Returns
+    -------
+    : numpy.array
+        `NumPy` array of the coordinates corresponding to each step.
+    """
+    points: np.array = np.zeros((digits.shape[0] + 1, 2), dtype=np.float32)
+
+    for n, digit in enumerate(digits):
+        angle = np.radians(digit * angle_step - 90.0)
+
+        points[n + 1, 0] += points[n, 0] + np.cos(angle)
+        points[n + 1, 1] += points[n, 1] + np.sin(angle)
+
+    if recenter:
+        points[:, 0] -= np.min(points[:, 0])
+        points[:, 1] -= np.min(points[:, 1])
+
+    return points
+
+
+def bench_coordinates(source: str = "constants/pi.dat"):
+    """Compare the loop and vectorized walks.
+
+    Parameters
+    ----------
+    source : str
+        Filepath to the source file to ingest. Defaults to `constants/pi.dat`.
+    """
+    sys.stdout.write("compute_coordinates\n")
+
+    for n in sizes:
+        digits = svg.fetch_digits(source, 0, n)
+
+        loop = _timeit(compute_coordinates_loop, digits, repeat=1)
+        f32 = _timeit(svg.compute_coordinates, digits)
+        f64 = _timeit(svg.compute_coordinates, digits, dtype=np.float64)
+
+        # drift of the single precision walk, compared to the double precision one
+        drift = np.max(
+            np.abs(
+                svg.compute_coordinates(digits, dtype=np.float64)
+                - svg.compute_coordinates(digits)
+            )
+        )
+
+        sys.stdout.write(
+            f"  {n:>9,d} digits: loop {loop:8.4f}s, "
+            f"float32 {f32:8.4f}s ({loop/f32:6.0f}x), "
+            f"float64 {f64:8.4f}s ({loop/f64:6.0f}x), "
+            f"float32 drift {drift:.2e}\n"
+        )
+
+
+def bench_walk(source: str = "constants/pi.dat", filename: str = "walk.npy"):
+    """Compare the in-memory and out-of-core (memory-mapped) walks, rescaling included.
+
+    Parameters
+    ----------
+    source : str
+        Filepath to the source file to ingest. Defaults to `constants/pi.dat`.
+    filename : str
+        Filepath to the `.npy` file to store the coordinates in. Defaults to
+        `walk.npy`.
+    """
+    sys.stdout.write("walk_coordinates\n")
+
+    def in_memory(n: int):
+        points = svg.compute_coordinates(svg.fetch_digits(source, 0, n))
+        svg.rescale_coordinates(points, max_width=3000)
+
+    def out_of_core(n: int):
+        points, lo, hi = svg.walk_coordinates(source, 0, n, filename)
+        points, _ = svg.rescale_walk(points, lo, hi, max_width=3000)
+        points[0 : n + 1]
+
+    for n in sizes:
+        memory = _timeit(in_memory, n)
+        mapped = _timeit(out_of_core, n)
+
+        sys.stdout.write(
+            f"  {n:>9,d} digits: in-memory {memory:8.4f}s, "
+            f"out-of-core {mapped:8.4f}s\n"
+        )
+
+    os.remove(filename)
+
+
+def bench_render(configs: typing.List[str] = ["configs/pi-1k.yaml"], size: int = None):
+    """Compare the size and rendering time of the `<line>`, `<path>` and `PNG` outputs.
+
+    Parameters
+    ----------
+    configs : typing.List[str]
+        Filepaths to the configurations to render. Defaults to `["configs/pi-1k.yaml"]`.
+    size : int
+        Number of digits to render, overriding the configurations. Defaults to `None`.
+    """
+    sys.stdout.write("write_plot\n")
+
+    for source in configs:
+        config = svg.fetch_config(source)
+        formats = {k: v for k, v in config["plot"]["format"].items() if k != "mode"}
+
+        if size is not None:
+            config["plot"]["data"]["until"] = config["plot"]["data"]["first"] + size
+
+        digits = svg.fetch_digits(**config["plot"]["data"])
+        colors, per_digit = svg.color_scheme(
+            **config["plot"]["color"], gradient_steps=len(digits)
+        )
+        points = svg.rescale_coordinates(svg.compute_coordinates(digits), **formats)
+
+        nbytes, times = {}, {}
+        for mode in ["line", "path", "png"]:
+            if mode == "png":
+                stream = io.BytesIO()
+                func, kwargs = raster.write_png, {"per_digit": per_digit}
+            else:
+                stream = io.StringIO()
+                func, kwargs = svg.write_plot, {"mode": mode, "per_digit": per_digit}
+
+            times[mode] = _timeit(
+                func,
+                stream,
+                digits,
+                points,
+                colors,
+                config["plot"]["style"],
+                **kwargs,
+                repeat=1,
+            )
+            nbytes[mode] = len(stream.getvalue())
+
+        sys.stdout.write(f"  {source} ({len(digits):,d} digits):\n")
+        for mode in nbytes:
+            sys.stdout.write(
+                f"    {mode:4s} {nbytes[mode]/1e6:8.2f}MB {times[mode]:7.3f}s "
+                f"({100*(nbytes[mode]/nbytes['line'] - 1):+.0f}%)\n"
+            )
+
+
+if __name__ == "__main__":
+    bench_coordinates()
+    bench_walk()
+    bench_render()
+    bench_render(["configs/pi-1M.yaml"])
@@ -0,0 +1,281 @@
+"""Raster backend: draw the random walk of an irrational number straight into a `PNG`.
+
+For walks of a million steps or more, `SVG` is the wrong target: the file gets huge and
+the browsers struggle. The segments are here drawn (antialiased) into a `NumPy` `RGBA`
+canvas, and the canvas written as a `PNG` file without any extra dependency.
+
+Selected from the configuration via (see `svg` for the other options):
+
+```yaml
+plot:
+  ...
+  format:
+    ...
+    mode: "png"                 # str: render to PNG instead of SVG
+  style:
+    stroke-width: 1             # float: width of the lines, in pixels
+```
+
+Run with:
+
+```bash
+$ .venv/bin/python svg.py pi-1M.yaml > output.png
+```
+"""
+
+import struct
+import typing
+import zlib
+
+import numpy as np
+
+
+def sample_segments(
+    starts: np.array,
+    ends: np.array,
+    shape: typing.Tuple[int, int],
+    width: float = 1.0,
+    spacing: float = 0.5,
+) -> typing.Tuple[np.array, np.array, np.array]:
+    """Supersample segments into the pixels of a canvas.
+
+    Each segment is sampled every `spacing` pixels along and across its width, all
+    segments at once, and each sample carries its share of the segment area.
+
+    Parameters
+    ----------
+    starts : numpy.array
+        `NumPy` array of shape `(N, 2)`, first extremity of each segment (in pixels).
+    ends : numpy.array
+        `NumPy` array of shape `(N, 2)`, second extremity of each segment (in pixels).
+    shape : typing.Tuple[int, int]
+        Height and width of the canvas; samples falling outside are dropped.
+    width : float
+        Width of the lines, in pixels. Defaults to `1.0`.
+    spacing : float
+        Distance between two samples, in pixels. Defaults to `0.5`.
+
+    Returns
+    -------
+    : numpy.array
+        Flat index of the pixel each sample falls in.
+    : numpy.array
+        Area carried by each sample, in squared pixels.
+    : numpy.array
+        Index (in `starts`/`ends`) of the segment each sample belongs to.
+    """
+    ny, nx = shape
+
+    # samples across the line are the same for all segments
+    across = max(1, int(np.ceil(width / spacing)))
+    offsets = (np.arange(across) + 0.5) * width / across - width / 2
+
+    x0, y0 = starts[:, 0], starts[:, 1]
+    dx, dy = ends[:, 0] - x0, ends[:, 1] - y0
+    length = np.maximum(np.hypot(dx, dy), 1e-6)
+
+    # samples along each segment, flattened over all segments
+    along = np.ceil(length / spacing).astype(np.int64)
+    segment = np.repeat(np.arange(starts.shape[0]), along)
+    k = np.arange(segment.shape[0]) - np.repeat(np.cumsum(along) - along, along)
+    t = (k + 0.5) / along[segment]
+
+    # samples across, offset along the normal of each segment
+    ux, uy = (dx / length)[segment], (dy / length)[segment]
+    x = (x0[segment] + t * dx[segment])[:, None] - offsets * uy[:, None]
+    y = (y0[segment] + t * dy[segment])[:, None] + offsets * ux[:, None]
+    area = np.repeat(length / along * width / across, along)
+
+    # box filter: each sample adds its share of area to the pixel it falls in
+    x = np.floor(x).astype(np.int64).ravel()
+    y = np.floor(y).astype(np.int64).ravel()
+    area = np.repeat(area, across)
+    segment = np.repeat(segment, across)
+
+    inside = (x >= 0) & (x < nx) & (y >= 0) & (y < ny)
+
+    return y[inside] * nx + x[inside], area[inside], segment[inside]
+
+
+def compose_canvas(
+    coverage: np.array,
+    owner: np.array,
+    digits: np.array,
+    colors: np.array,
+    shape: typing.Tuple[int, int],
+    per_digit: bool = False,
+) -> np.array:
+    """Turn the coverage and owner of each pixel into an `RGBA` canvas.
+
+    Parameters
+    ----------
+    coverage : numpy.array
+        Flat `NumPy` array of the area covered in each pixel.
+    owner : numpy.array
+        Flat `NumPy` array of the last step going through each pixel (`-1` if none).
+    digits : numpy.array
+        `NumPy` array of the decimal digits.
+    colors : numpy.array
+        `NumPy` array (`uint8`) of shape `(N, 3)`, one color for each digit, or colors
+        interpolated from the defined gradient.
+    shape : typing.Tuple[int, int]
+        Height and width of the canvas.
+    per_digit : bool
+        Whether the colors are one for each digit, or one for each step (see
+        `svg.color_scheme()`). Defaults to `False`.
+
+    Returns
+    -------
+    : numpy.array
+        `NumPy` array (`uint8`) of shape `(height, width, 4)`.
+    """
+    canvas: np.array = np.zeros((coverage.shape[0], 4), dtype=np.uint8)
+
+    # same pick as svg.step_colors(), this module being imported by svg
+    drawn = owner >= 0
+    steps = owner[drawn]
+    canvas[drawn, :3] = colors[digits[steps]] if per_digit else colors[steps]
+    canvas[:, 3] = np.round(np.clip(coverage, 0.0, 1.0) * 255).astype(np.uint8)
+
+    return canvas.reshape((*shape, 4))
+
+
+def render_canvas(
+    digits: np.array,
+    points: np.array,
+    colors: np.array,
+    width: float = 1.0,
+    spacing: float = 0.5,
+    chunk_size: int = 65536,
+    size: typing.Tuple[float, float] = None,
+    per_digit: bool = False,
+) -> np.array:
+    """Rasterize the random walk into an `RGBA` canvas.
+
+    The segments are supersampled (see `sample_segments()`) one chunk at a time. The
+    accumulated areas give the (antialiased) coverage of each pixel, while its color is
+    the color of the last segment going through it, as if painted in order.
+
+    Parameters
+    ----------
+    digits : numpy.array
+        `NumPy` array of the decimal digits.
+    points : numpy.array
+        `NumPy` array of the (rescaled) coordinates corresponding to each step.
+    colors : numpy.array
+        `NumPy` array (`uint8`) of shape `(N, 3)`, one color for each digit, or colors
+        interpolated from the defined gradient.
+    width : float
+        Width of the lines, in pixels. Defaults to `1.0`.
+    spacing : float
+        Distance between two samples, in pixels. Defaults to `0.5`.
+    chunk_size : int
+        Number of segments rasterized at once. Defaults to `65536`.
+    size : typing.Tuple[float, float]
+        Width and height of the plot, if known. Defaults to `None` (computed from the
+        coordinates).
+    per_digit : bool
+        Whether the colors are one for each digit, or one for each step (see
+        `svg.color_scheme()`). Defaults to `False`.
+
+    Returns
+    -------
+    : numpy.array
+        `NumPy` array (`uint8`) of shape `(height, width, 4)`.
+    """
+    if size is None:
+        size = (np.max(points[:, 0]), np.max(points[:, 1]))
+
+    nx = int(np.ceil(size[0])) + 1
+    ny = int(np.ceil(size[1])) + 1
+
+    coverage: np.array = np.zeros(nx * ny, dtype=np.float64)
+    owner: np.array = np.full(nx * ny, -1, dtype=np.int64)
+
+    for i in range(0, digits.shape[0], chunk_size):
+        j = min(i + chunk_size, digits.shape[0])
+
+        index, area, segment = sample_segments(
+            points[i:j], points[i + 1 : j + 1], (ny, nx), width, spacing
+        )
+
+        coverage += np.bincount(index, weights=area, minlength=nx * ny)
+        np.maximum.at(owner, index, segment + i)
+
+    return compose_canvas(coverage, owner, digits, colors, (ny, nx), per_digit)
+
+
+def encode_png(canvas: np.array, level: int = 6) -> bytes:
+    """Encode an `RGBA` canvas as a `PNG` file.
+
+    Copied in `scraping-meridians/code/png.py`, keep both in sync.
+
+    Parameters
+    ----------
+    canvas : numpy.array
+        `NumPy` array (`uint8`) of shape `(height, width, 4)`.
+    level : int
+        `zlib` compression level. Defaults to `6`.
+
+    Returns
+    -------
+    : bytes
+        Content of the `PNG` file.
+    """
+    ny, nx, _ = canvas.shape
+
+    def chunk(kind: bytes, data: bytes) -> bytes:
+        crc = zlib.crc32(data, zlib.crc32(kind))
+        return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", crc)
+
+    # each scanline is prefixed by its filter type (0, none)
+    rows: np.array = np.zeros((ny, nx * 4 + 1), dtype=np.uint8)
+    rows[:, 1:] = canvas.reshape((ny, nx * 4))
+
+    return b"".join(
+        [
+            b"\x89PNG\r\n\x1a\n",
+            chunk(b"IHDR", struct.pack(">IIBBBBB", nx, ny, 8, 6, 0, 0, 0)),
+            chunk(b"IDAT", zlib.compress(rows.tobytes(), level)),
+            chunk(b"IEND", b""),
+        ]
+    )
+
+
+def write_png(
+    stream: typing.BinaryIO,
+    digits: np.array,
+    points: np.array,
+    colors: np.array,
+    styles: typing.Dict[str, str],
+    size: typing.Tuple[float, float] = None,
+    per_digit: bool = False,
+):
+    """Rasterize the random walk and write it as a `PNG` file to a file-like object.
+
+    Parameters
+    ----------
+    stream : typing.BinaryIO
+        File-like object to write to (`sys.stdout.buffer`, file opened in binary mode,
+        `io.BytesIO`...).
+    digits : numpy.array
+        `NumPy` array of the decimal digits.
+    points : numpy.array
+        `NumPy` array of the (rescaled) coordinates corresponding to each step.
+    colors : numpy.array
+        `NumPy` array (`uint8`) of shape `(N, 3)`, one color for each digit, or colors
+        interpolated from the defined gradient.
+    styles : typing.Dict[str, str]
+        Extra styling options for the lines; only `stroke-width` is considered.
+    size : typing.Tuple[float, float]
+        Width and height of the plot, if known. Defaults to `None` (computed from the
+        coordinates).
+    per_digit : bool
+        Whether the colors are one for each digit, or one for each step (see
+        `svg.color_scheme()`). Defaults to `False`.
+    """
+    width = float(styles.get("stroke-width", 1.0))
+    canvas = render_canvas(
+        digits, points, colors, width=width, size=size, per_digit=per_digit
+    )
+    stream.write(encode_png(canvas))
@@ -0,0 +1,476 @@
+"""Digit statistics and walk metrics, to compare the constants with each other.
+
+Available metrics, over any window of decimals:
+
+* digit histograms and n-gram frequencies,
+* extent (width and height) of the random walk,
+* number of returns of the walk to its starting point.
+
+Nothing is rescanned for overlapping windows: the first query on a source file builds
+(once, streaming the memory-mapped decimals in chunks) a few prefix structures stored
+on disk next to the results, namely the running n-gram counts every `block` decimals,
+and the exact position of the walk after each step. Any window is then answered from
+differences of prefix sums, plus short scans at its edges. Results are memoized on disk
+as well, keyed by the hash of the source file and the window.
+
+Positions are kept exact: each step is one of the ten 10th roots of unity, which are
+all integer combinations of `1`, `w`, `w^2` and `w^3` (`w` being the first 5th root of
+unity). A return to the origin is then an exact equality of four integers, and never
+suffers from rounding errors.
+
+Run with (from the `colourful-constants` folder, the path to the constants being
+relative):
+
+```bash
+$ .venv/bin/python code/stats.py configs/*.yaml
+```
+
+Attributes
+----------
+cache : str
+    Path to the folder to store the prefix structures and the results in.
+block : int
+    Number of decimals in between two checkpoints of the running n-gram counts.
+"""
+
+import functools
+import hashlib
+import os
+import sys
+import tempfile
+import typing
+
+import numpy as np
+import yaml
+
+import svg
+
+cache: str = "cache/stats"
+
+block: int = 65536
+
+
+@functools.lru_cache
+def _file_hash(source: str, mtime: float, size: int) -> str:
+    """Hash the content of a source file (memoized on its modification time and size).
+
+    Parameters
+    ----------
+    source : str
+        Filepath to the source file to hash.
+    mtime : float
+        Modification time of the file.
+    size : int
+        Size of the file, in bytes.
+
+    Returns
+    -------
+    : str
+        Hexadecimal `SHA-1` digest of the content of the file.
+    """
+    digest = hashlib.sha1()
+
+    with open(source, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 22), b""):
+            digest.update(chunk)
+
+    return digest.hexdigest()
+
+
+def file_hash(source: str) -> str:
+    """Hash the content of a source file.
+
+    Parameters
+    ----------
+    source : str
+        Filepath to the source file to hash.
+
+    Returns
+    -------
+    : str
+        Hexadecimal `SHA-1` digest of the content of the file.
+    """
+    info = os.stat(source)
+
+    return _file_hash(source, info.st_mtime, info.st_size)
+
+
+def _ngram_codes(digits: np.array, n: int) -> np.array:
+    """Encode each n-gram as an integer (its digits read as a decimal number).
+
+    Parameters
+    ----------
+    digits : numpy.array
+        `NumPy` array of the decimal digits.
+    n : int
+        Length of the n-grams.
+
+    Returns
+    -------
+    : numpy.array
+        `NumPy` array of the codes of the `len(digits) - n + 1` n-grams.
+    """
+    codes: np.array = np.zeros(max(0, digits.shape[0] - n + 1), dtype=np.int64)
+
+    for i in range(n):
+        codes = codes * 10 + digits[i : i + codes.shape[0]]
+
+    return codes
+
+
+def _scan_ngrams(source: str, first: int, until: int, n: int) -> np.array:
+    """Count the n-grams starting in a window of decimals, scanning the window.
+
+    Parameters
+    ----------
+    source : str
+        Filepath to the source file to ingest.
+    first : int
+        First starting position to consider.
+    until : int
+        Last starting position to consider (excluded).
+    n : int
+        Length of the n-grams.
+
+    Returns
+    -------
+    : numpy.array
+        `NumPy` array of the `10**n` counts.
+    """
+    counts: np.array = np.zeros(10**n, dtype=np.int64)
+
+    for i in range(first, until, block):
+        j = min(i + block, until)
+        digits = svg.fetch_digits(source, i, j + n - 1).astype(np.int64)
+        counts += np.bincount(_ngram_codes(digits, n), minlength=10**n)
+
+    return counts
+
+
+def _prefix(
+    source: str, name: str, build: typing.Callable[[str, str], None]
+) -> np.array:
+    """Load (memory-map) a prefix structure of a source file, building it if needed.
+
+    Parameters
+    ----------
+    source : str
+        Filepath to the source file.
+    name : str
+        Name of the prefix structure.
+    build : typing.Callable[[str, str], None]
+        Function computing the prefix structure from the source file, and storing it in
+        the given `.npy` file.
+
+    Returns
+    -------
+    : numpy.array
+        Memory-mapped `NumPy` array of the prefix structure.
+    """
+    filename = os.path.join(cache, f"{file_hash(source)}-{name}.npy")
+
+    try:
+        return np.load(filename, mmap_mode="r")
+    except FileNotFoundError:
+        pass
+
+    os.makedirs(cache, exist_ok=True)
+
+    # never leave a partially written structure behind
+    fd, temporary = tempfile.mkstemp(dir=cache, suffix=".npy")
+    os.close(fd)
+    try:
+        build(source, temporary)
+        os.replace(temporary, filename)
+    except BaseException:
+        os.remove(temporary)
+        raise
+
+    return np.load(filename, mmap_mode="r")
+
+
+def _build_ngrams(source: str, n: int) -> np.array:
+    """Compute the running n-gram counts, every `block` starting positions.
+
+    Parameters
+    ----------
+    source : str
+        Filepath to the source file.
+    n : int
+        Length of the n-grams.
+
+    Returns
+    -------
+    : numpy.array
+        `NumPy` array of shape `(B + 1, 10**n)`: counts of the n-grams starting before
+        each multiple of `block`.
+    """
+    starts = max(0, svg.map_digits(source).shape[0] - n + 1)
+
+    counts: np.array = np.zeros((-(-starts // block) + 1, 10**n), dtype=np.int64)
+    for b, i in enumerate(range(0, starts, block)):
+        counts[b + 1] = counts[b] + _scan_ngrams(source, i, min(i + block, starts), n)
+
+    return counts
+
+
+def _steps() -> np.array:
+    """Express each step of the walk as integer combinations of `1`, `w`, `w^2`, `w^3`.
+
+    Digit `d` steps along `exp(i*pi*d/5) = (-1)^d * w^(3d)` (rotated by -90 degrees,
+    irrelevant here), and `w^4 = -1 - w - w^2 - w^3`.
+
+    Returns
+    -------
+    : numpy.array
+        `NumPy` array (`int32`) of shape `(10, 4)`.
+    """
+    powers: np.array = np.vstack((np.eye(4, dtype=np.int32), -np.ones(4, np.int32)))
+    d: np.array = np.arange(10)
+
+    return ((-1) ** d)[:, None].astype(np.int32) * powers[(3 * d) % 5]
+
+
+def _basis() -> np.array:
+    """Cartesian coordinates of `1`, `w`, `w^2` and `w^3`, rotated as the walk is.
+
+    Returns
+    -------
+    : numpy.array
+        `NumPy` array of shape `(4, 2)`.
+    """
+    angles: np.array = np.radians(np.arange(4) * 72.0 - 90.0)
+
+    return np.stack((np.cos(angles), np.sin(angles)), axis=1)
+
+
+def _build_walk(source: str, filename: str, chunk_size: int = 1 << 22):
+    """Compute the exact position of the walk after each step of a source file.
+
+    The positions are written to a memory-mapped `.npy` file one chunk at a time, as
+    `svg.walk_coordinates()` does, never held in memory as a whole.
+
+    Parameters
+    ----------
+    source : str
+        Filepath to the source file.
+    filename : str
+        Filepath to the `.npy` file to store the positions in: `NumPy` array (`int32`)
+        of shape `(N + 1, 4)`.
+    chunk_size : int
+        Number of steps computed at once. Defaults to `4194304`.
+    """
+    steps = _steps()
+    digits = svg.map_digits(source)
+
+    walk: np.array = np.lib.format.open_memmap(
+        filename, mode="w+", dtype=np.int32, shape=(digits.shape[0] + 1, 4)
+    )
+    walk[0] = 0
+
+    for i in range(0, digits.shape[0], chunk_size):
+        j = min(i + chunk_size, digits.shape[0])
+        np.cumsum(
+            steps[digits[i:j] - ord("0")],
+            axis=0,
+            dtype=np.int32,
+            out=walk[i + 1 : j + 1],
+        )
+        walk[i + 1 : j + 1] += walk[i]
+
+    walk.flush()
+
+
+def ngram_frequencies(
+    source: str, first: int = 0, until: int = 100, n: int = 2
+) -> np.array:
+    """Count the n-grams found in a window of decimals.
+
+    Parameters
+    ----------
+    source : str
+        Filepath to the source file to ingest.
+    first : int
+        First decimal to consider.
+    until : int
+        Last decimal to consider.
+    n : int
+        Length of the n-grams. Defaults to `2`.
+
+    Returns
+    -------
+    : numpy.array
+        `NumPy` array of the `10**n` counts, indexed by the n-gram read as a number.
+    """
+    prefix = _prefix(
+        source, f"ngrams-{n}", lambda s, f: np.save(f, _build_ngrams(s, n))
+    )
+
+    # n-grams entirely within the window
+    until = max(first, min(until, svg.map_digits(source).shape[0]) - n + 1)
+
+    a, b = -(-first // block), until // block
+    if a >= b:
+        return _scan_ngrams(source, first, until, n)
+
+    return (
+        prefix[b]
+        - prefix[a]
+        + _scan_ngrams(source, first, a * block, n)
+        + _scan_ngrams(source, b * block, until, n)
+    )
+
+
+def digit_histogram(source: str, first: int = 0, until: int = 100) -> np.array:
+    """Count each digit in a window of decimals.
+
+    Parameters
+    ----------
+    source : str
+        Filepath to the source file to ingest.
+    first : int
+        First decimal to consider.
+    until : int
+        Last decimal to consider.
+
+    Returns
+    -------
+    : numpy.array
+        `NumPy` array of the 10 counts.
+    """
+    return ngram_frequencies(source, first, until, 1)
+
+
+def walk_extent(
+    source: str, first: int = 0, until: int = 100, chunk_size: int = 1 << 22
+) -> typing.Tuple[float, float]:
+    """Measure the width and height of the walk over a window of decimals.
+
+    Parameters
+    ----------
+    source : str
+        Filepath to the source file to ingest.
+    first : int
+        First decimal to consider.
+    until : int
+        Last decimal to consider.
+    chunk_size : int
+        Number of steps considered at once. Defaults to `4194304`.
+
+    Returns
+    -------
+    : typing.Tuple[float, float]
+        Width and height of the walk (unit steps).
+    """
+    walk = _prefix(source, "walk", _build_walk)
+    basis = _basis()
+
+    until = min(until, walk.shape[0] - 1)
+    lo: np.array = np.zeros(2)
+    hi: np.array = np.zeros(2)
+
+    for i in range(first, until + 1, chunk_size):
+        j = min(i + chunk_size, until + 1)
+        points = (walk[i:j] - walk[first]) @ basis
+
+        np.minimum(lo, np.min(points, axis=0), out=lo)
+        np.maximum(hi, np.max(points, axis=0), out=hi)
+
+    width, height = hi - lo
+
+    return float(width), float(height)
+
+
+def origin_returns(
+    source: str, first: int = 0, until: int = 100, chunk_size: int = 1 << 22
+) -> int:
+    """Count the returns of the walk to its starting point, over a window of decimals.
+
+    Parameters
+    ----------
+    source : str
+        Filepath to the source file to ingest.
+    first : int
+        First decimal to consider.
+    until : int
+        Last decimal to consider.
+    chunk_size : int
+        Number of steps considered at once. Defaults to `4194304`.
+
+    Returns
+    -------
+    : int
+        Number of steps ending exactly on the starting point of the walk.
+    """
+    walk = _prefix(source, "walk", _build_walk)
+
+    until = min(until, walk.shape[0] - 1)
+    count = 0
+
+    for i in range(first + 1, until + 1, chunk_size):
+        j = min(i + chunk_size, until + 1)
+        count += int(np.count_nonzero(np.all(walk[i:j] == walk[first], axis=1)))
+
+    return count
+
+
+def digit_stats(
+    source: str, first: int = 0, until: int = 100, n: int = 2
+) -> typing.Dict[str, typing.Any]:
+    """Compute all the metrics over a window of decimals, memoized on disk.
+
+    Parameters
+    ----------
+    source : str
+        Filepath to the source file to ingest.
+    first : int
+        First decimal to consider.
+    until : int
+        Last decimal to consider.
+    n : int
+        Length of the n-grams. Defaults to `2`.
+
+    Returns
+    -------
+    : typing.Dict[str, typing.Any]
+        Dictionary of the metrics: `histogram`, `ngrams-<n>`, `extent` and `returns`.
+    """
+    filename = os.path.join(cache, f"{file_hash(source)}-{first}-{until}.yaml")
+
+    try:
+        stats = svg.fetch_config(filename)
+    except FileNotFoundError:
+        stats = {}
+
+    missing = {
+        "histogram": lambda: digit_histogram(source, first, until).tolist(),
+        f"ngrams-{n}": lambda: ngram_frequencies(source, first, until, n).tolist(),
+        "extent": lambda: list(walk_extent(source, first, until)),
+        "returns": lambda: origin_returns(source, first, until),
+    }
+    missing = {k: v for k, v in missing.items() if k not in stats}
+
+    if missing:
+        stats.update({k: v() for k, v in missing.items()})
+
+        os.makedirs(cache, exist_ok=True)
+        with open(filename, "w") as f:
+            yaml.dump(stats, f)
+
+    return stats
+
+
+if __name__ == "__main__":
+    for source in sys.argv[1:]:
+        data = svg.fetch_config(source)["plot"]["data"]
+        stats = digit_stats(**data)
+
+        counts = np.array(stats["histogram"])
+        chi2 = np.sum((counts - counts.mean()) ** 2 / counts.mean())
+
+        sys.stdout.write(
+            f"{source}: {data['until'] - data['first']:,d} digits, "
+            f"chi2 {chi2:.2f}, "
+            f"extent {stats['extent'][0]:.1f}x{stats['extent'][1]:.1f}, "
+            f"{stats['returns']} returns to the origin\n"
+        )
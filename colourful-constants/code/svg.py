@@ -24,6 +24,8 @@ plot:
     max_width: 2480             # int: maximum width of the final plot
     min_height: 3508            # int: minimum height of the final plot
     max_height: 3508            # int: maximum height of the final plot
+    mode: "line"                # str: one <line> per digit, "path" to merge them, "png"
+    walk: "walk.npy"            # str: compute the walk out-of-core, in this file
   style:
     ...                         # extra styling options for the SVG lines
 ```
@@ -54,8 +56,20 @@ line_svg : string.Template
       (_better call it a segment then..._).
     - `color`: color of the `<line>` element.
     - `styles`: extra styling options for the `<line>` element.
+svg_group : string.Template
+    Template to render a `<g>` element sharing styles among its children. Variables
+    substituted:
+    - `styles`: styling options for the `<path>` elements.
+    - `plot`: `<path>` elements defining the plot itself.
+svg_path : string.Template
+    Template to render a single `<path>` element. Variables substituted:
+    - `d`: `M x y L x y x y ...` path data, covering consecutive steps.
+    - `color`: color of the `<path>` element.
 """
 
+import functools
+import io
+import mmap
 import string
 import sys
 import typing
@@ -64,6 +78,8 @@ import colour
 import numpy as np
 import yaml
 
+import raster
+
 svg: string.Template = string.Template(
     '<?xml version="1.0" encoding="utf-8" ?>\n'
     '<svg '
@@ -82,6 +98,10 @@ svg_line: string.Template = string.Template(
     '<line x1="$x1" y1="$y1" x2="$x2" y2="$y2" stroke="$color" $styles />'
 )
 
+svg_group: string.Template = string.Template('<g $styles>$plot</g>')
+
+svg_path: string.Template = string.Template('<path d="$d" stroke="$color" />')
+
 
 def fetch_config(source: str) -> typing.Dict[str, typing.Any]:
     """Read the configuration of the current plot.
@@ -99,9 +119,109 @@ def fetch_config(source: str) -> typing.Dict[str, typing.Any]:
     return yaml.load(open(source).read(), Loader=yaml.Loader)
 
 
+def check_config(config: typing.Dict[str, typing.Any]):
+    """Validate the configuration of a plot, before any work is done.
+
+    Parameters
+    ----------
+    config : typing.Dict[str, typing.Any]
+        Dictionary of the configuration options.
+
+    Raises
+    ------
+    : ValueError
+        If a section or an option is missing, misspelled, or inconsistent (_e.g._, more
+        decimals requested than available in the source file).
+    """
+    plot = config.get("plot") if isinstance(config, dict) else None
+    if not isinstance(plot, dict):
+        raise ValueError('Missing "plot" section.')
+
+    for section in ["data", "color"]:
+        if section not in plot:
+            hint = [k for k in plot if k.rstrip("s") == section]
+            raise ValueError(
+                f'Missing "plot.{section}" section'
+                + (f' (found "plot.{hint[0]}" instead).' if hint else ".")
+            )
+
+    if not isinstance(plot["data"], dict):
+        raise ValueError('The "plot.data" section is not a mapping.')
+
+    data = plot["data"]
+    for key in ["source", "first", "until"]:
+        if key not in data:
+            raise ValueError(f'Missing "plot.data.{key}" option.')
+    if not 0 <= data["first"] < data["until"]:
+        raise ValueError(
+            f'Expected 0 <= "plot.data.first" < "plot.data.until", got '
+            f'{data["first"]} and {data["until"]}.'
+        )
+    if data["until"] > map_digits(data["source"]).shape[0]:
+        raise ValueError(
+            f'Only {map_digits(data["source"]).shape[0]} decimals in '
+            f'"{data["source"]}", "plot.data.until" is {data["until"]}.'
+        )
+
+    color = plot["color"]
+    if isinstance(color, list) and len(color) == 10:
+        return
+    if not isinstance(color, dict):
+        raise ValueError(
+            'Expected either a gradient or one color for each digit in "plot.color".'
+        )
+    if any(str(k).startswith("gradient") for k in color):
+        expected = {"gradient_start", "gradient_until"}
+        if set(color) != expected:
+            raise ValueError(
+                'Expected "plot.color.gradient_start" and "plot.color.gradient_until", '
+                f'got {", ".join(repr(k) for k in color)}.'
+            )
+    elif sorted(str(k) for k in color) != [str(d) for d in range(10)]:
+        raise ValueError(
+            "Expected either a gradient or one color for each digit (0 to 9) in "
+            f'"plot.color", got {", ".join(repr(k) for k in color)}.'
+        )
+
+
+@functools.lru_cache(maxsize=None)
+def map_digits(source: str) -> np.array:
+    """Memory-map the decimals of the source file.
+
+    The file is mapped once (per source) and the decimal point located once; nothing is
+    actually read from disk until a window of the returned array is accessed.
+
+    Parameters
+    ----------
+    source : str
+        Filepath to the source file to map.
+
+    Returns
+    -------
+    : numpy.array
+        Read-only `NumPy` view (`uint8`) of the raw characters following the decimal
+        point.
+
+    Raises
+    ------
+    : ValueError
+        If no decimal point is found in the source file.
+    """
+    with open(source, "rb") as f:
+        buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    dot = buffer.find(b".")
+    if dot < 0:
+        raise ValueError(f'No decimal point found in "{source}".')
+
+    return np.frombuffer(buffer, dtype=np.uint8, offset=dot + 1)
+
+
 def fetch_digits(source: str, first: int = 0, until: int = 100) -> np.array:
     """Extract the decimals from the source file.
 
+    Only the requested window is ever read from disk, and converted in bulk.
+
     Parameters
     ----------
     source : str
@@ -114,15 +234,103 @@ def fetch_digits(source: str, first: int = 0, until: int = 100) -> np.array:
     Returns
     -------
     : numpy.array
-        `NumPy` array of the decimal digits.
+        `NumPy` array (`uint8`) of the decimal digits.
+    """
+    return map_digits(source)[first:until] - ord("0")
+
+
+class _Digits:
+    """Convert the characters of a memory-mapped source to digits, as they are accessed.
+
+    Stands for the array returned by `fetch_digits()`, without ever holding all of it:
+    the renderers only read it one chunk (or one set of steps) at a time.
+    """
+
+    def __init__(self, chars: np.array):
+        self.chars = chars
+        self.shape = chars.shape
+
+    def __getitem__(self, key: typing.Any) -> np.array:
+        return self.chars[key] - ord("0")
+
+
+def _hue_to_rgb(v1: np.array, v2: np.array, h: np.array) -> np.array:
+    """Vectorized version of the `colour._hue2rgb()` helper.
+
+    Parameters
+    ----------
+    v1 : numpy.array
+        Lower bound of the channel.
+    v2 : numpy.array
+        Upper bound of the channel.
+    h : numpy.array
+        Rotation around the chromatic circle.
+
+    Returns
+    -------
+    : numpy.array
+        Value of the channel, between `0` and `1`.
     """
-    digits: np.array = np.zeros(until - first, dtype=np.int8)
+    h = np.where(h < 0, h + 1, np.where(h > 1, h - 1, h))
 
-    # below gymnastics serves as a quick check to see if things fit in memory
-    for n, d in enumerate(open(source).read().split(".")[1][first:until]):
-        digits[n] += int(d)
+    return np.select(
+        [6 * h < 1, 2 * h < 1, 3 * h < 2],
+        [v1 + (v2 - v1) * 6 * h, v2, v1 + (v2 - v1) * ((2.0 / 3) - h) * 6],
+        v1,
+    )
 
-    return digits
+
+def _hsl_to_rgb(hsl: np.array) -> np.array:
+    """Vectorized version of the `colour.hsl2rgb()` function.
+
+    Parameters
+    ----------
+    hsl : numpy.array
+        `NumPy` array of shape `(N, 3)`, hue, saturation and lightness between `0` and
+        `1`.
+
+    Returns
+    -------
+    : numpy.array
+        `NumPy` array (`uint8`) of shape `(N, 3)`, quantized as `colour` would.
+    """
+    h, s, l = hsl[:, 0], hsl[:, 1], hsl[:, 2]
+
+    v2 = np.where(l < 0.5, l * (1.0 + s), (l + s) - (s * l))
+    v1 = 2.0 * l - v2
+
+    rgb = np.stack(
+        (
+            _hue_to_rgb(v1, v2, h + (1.0 / 3)),
+            _hue_to_rgb(v1, v2, h),
+            _hue_to_rgb(v1, v2, h - (1.0 / 3)),
+        ),
+        axis=1,
+    )
+    rgb[s == 0] = l[s == 0, None]
+
+    return (rgb * 255 + 0.5 - colour.FLOAT_ERROR).astype(np.uint8)
+
+
+class _Gradient:
+    """Interpolate the colors of a gradient, as they are accessed.
+
+    Stands for the array returned by `color_scheme()`, without ever holding all of it;
+    each color is computed the same way, hence identical.
+    """
+
+    def __init__(self, start: np.array, step: np.array, steps: int):
+        self.start = start
+        self.step = step
+        self.shape = (steps, 3)
+
+    def __getitem__(self, key: typing.Any) -> np.array:
+        if isinstance(key, slice):
+            index = np.arange(*key.indices(self.shape[0]))
+        else:
+            index = np.asarray(key)
+
+        return _hsl_to_rgb(self.start + self.step * index[:, None])
 
 
 def color_scheme(
@@ -131,13 +339,15 @@ def color_scheme(
     gradient_until: str = None,
     color_codes_10: typing.Union[
         typing.Dict[typing.Union[int, str], str], typing.List[str]
-    ] = None
-) -> typing.List[colour.Color]:
+    ] = None,
+    lazy: bool = False,
+) -> typing.Tuple[np.array, bool]:
     """Define the color scheme used to light up the path.
 
     Color management in `Python` can be cumbersome... but check the pretty nifty
     [`colour` package](https://github.com/vaab/colour), particularly useful to generate
-    gradients of random sizes.
+    gradients of random sizes. Only the extremities of the gradient go through it
+    though: the steps in between are interpolated (in the same `HSL` space) all at once.
 
     Parameters
     ----------
@@ -149,34 +359,109 @@ def color_scheme(
         Last color of the gradient. Defaults to `None`.
     color_codes_10 : typing.Union[typing.Dict[typing.Union[int, str], str], typing.List[str]]
         One color for each digit. Defaults to `None`.
+    lazy : bool
+        Only interpolate the colors of the gradient when (and as) they are accessed.
+        Defaults to `False`.
 
     Returns
     -------
-    : typing.List[colour.Color]
-        List of colors, one for each digit, or list of colors interpolated from the
-        defined gradient.
-    """
-    colors: typing.List[colour.Color] = []
+    : numpy.array
+        `NumPy` array (`uint8`) of shape `(N, 3)`, one color for each digit, or colors
+        interpolated from the defined gradient (sliceable object if `lazy`).
+    : bool
+        Whether the colors are one for each digit (`True`) or one for each step of the
+        gradient (`False`).
 
+    Raises
+    ------
+    : ValueError
+        If neither a gradient nor ten colors are defined.
+    """
     if gradient_start is not None and gradient_until is not None:
-        s = colour.Color(gradient_start)
-        e = colour.Color(gradient_until)
-        colors = list(s.range_to(e, gradient_steps))
+        s = np.array(colour.Color(gradient_start).hsl)
+        e = np.array(colour.Color(gradient_until).hsl)
+
+        # same arithmetic as colour.color_scale(), for identical results
+        n = gradient_steps - 1
+        step = (e - s) / n if n > 0 else np.zeros(3)
+        gradient = _Gradient(s, step, n + 1)
+
+        return (gradient if lazy else gradient[:]), False
 
-    elif len(colour_array) == 10:
+    if color_codes_10 is not None and len(color_codes_10) == 10:
         if type(color_codes_10) == dict:
-            colors = [colour.Color(color_codes_10[n]) for n in color_codes_10]
-        else:
-            colors = color_list
+            keys = sorted(color_codes_10, key=int)
+            color_codes_10 = [color_codes_10[k] for k in keys]
+
+        return (
+            _hsl_to_rgb(np.array([colour.Color(c).hsl for c in color_codes_10])),
+            True,
+        )
+
+    raise ValueError("Provide either a gradient or one color for each digit.")
+
+
+def color_codes(colors: np.array) -> typing.Tuple[np.array, np.array]:
+    """Quantize the colors to a palette of unique colors and their `SVG` codes.
+
+    Only the unique colors are stringified (through `colour`, to keep the color names
+    and short hexadecimal codes), typically a few thousands for a gradient of a million
+    steps.
+
+    Parameters
+    ----------
+    colors : numpy.array
+        `NumPy` array (`uint8`) of shape `(N, 3)`.
+
+    Returns
+    -------
+    : numpy.array
+        `NumPy` (object) array of the codes of the unique colors.
+    : numpy.array
+        `NumPy` array of shape `(N,)`, index of each color in the palette.
+    """
+    keys = colors.astype(np.uint32)
+    keys = (keys[:, 0] << 16) | (keys[:, 1] << 8) | keys[:, 2]
+
+    palette, index = np.unique(keys, return_inverse=True)
+    codes = [colour.hex2web(f"#{k:06x}") for k in palette.tolist()]
+    codes = np.array(codes, dtype=object)
 
-    return colors
+    return codes, index.ravel()
+
+
+def _step_vectors(angle_step: float, dtype: np.dtype) -> np.array:
+    """Precompute the unit vector associated with each digit.
+
+    Parameters
+    ----------
+    angle_step : float
+        Angle in between two digits.
+    dtype : numpy.dtype
+        Type of the coordinates.
+
+    Returns
+    -------
+    : numpy.array
+        `NumPy` array of shape `(10, 2)`, the step taken for each digit.
+    """
+    angles: np.array = np.radians(np.arange(10) * angle_step - 90.0)
+
+    return np.stack((np.cos(angles), np.sin(angles)), axis=1).astype(dtype)
 
 
 def compute_coordinates(
-    digits: np.array, angle_step: float = 36.0, recenter: bool = True
+    digits: np.array,
+    angle_step: float = 36.0,
+    recenter: bool = True,
+    dtype: np.dtype = np.float32,
 ) -> np.array:
     """Generate the coordinates of each step of the path.
 
+    Each digit picks one of ten unit vectors (precomputed once), and the path is the
+    cumulative sum of these steps. No `Python` loop involved, which makes the
+    million-digit walks bearable.
+
     Parameters
     ----------
     digits : numpy.array
@@ -185,30 +470,96 @@ def compute_coordinates(
         Angle in between two digits. Defaults to `36.0`.
     recenter : bool
         Recenter the plot to avoid negative coordinates. Defaults to `True`.
+    dtype : numpy.dtype
+        Type used to accumulate and store the coordinates. Defaults to `numpy.float32`;
+        use `numpy.float64` for long walks where the rounding errors pile up.
 
     Returns
     -------
     : numpy.array
         `NumPy` array of the coordinates corresponding to each step.
     """
-    points: np.array = np.zeros((digits.shape[0] + 1, 2), dtype=np.float32)
+    vectors = _step_vectors(angle_step, dtype)
 
-    for n, digit in enumerate(digits):
-        angle = np.radians(digit*angle_step - 90.0)
-
-        points[n + 1,0] += points[n,0] + np.cos(angle)
-        points[n + 1,1] += points[n,1] + np.sin(angle)
+    points: np.array = np.zeros((digits.shape[0] + 1, 2), dtype=dtype)
+    np.cumsum(vectors[digits], axis=0, dtype=dtype, out=points[1:])
 
     if recenter:
-        xmin = np.min(points[:,0])
-        ymin = np.min(points[:,1])
-    
-        points[:,0] -= xmin
-        points[:,1] -= ymin
+        points -= np.min(points, axis=0)
 
     return points
 
 
+def walk_coordinates(
+    source: str,
+    first: int = 0,
+    until: int = 100,
+    filename: str = "walk.npy",
+    angle_step: float = 36.0,
+    dtype: np.dtype = np.float32,
+    chunk_size: int = 1 << 22,
+) -> typing.Tuple[np.array, np.array, np.array]:
+    """Generate the coordinates of each step of the path, out-of-core.
+
+    The digits are streamed from the memory-mapped source file one window at a time,
+    and the coordinates written to a memory-mapped `.npy` file. The end point of each
+    window is carried over to the next one (added to its first step, the rounding is
+    then the same as `compute_coordinates()`), and the bounding box of the walk tracked
+    along the way. Nothing is recentered: see `rescale_walk()`.
+
+    Parameters
+    ----------
+    source : str
+        Filepath to the source file to ingest.
+    first : int
+        First decimal to consider.
+    until : int
+        Last decimal to consider.
+    filename : str
+        Filepath to the `.npy` file to store the coordinates in. Defaults to
+        `walk.npy`.
+    angle_step : float
+        Angle in between two digits. Defaults to `36.0`.
+    dtype : numpy.dtype
+        Type used to accumulate and store the coordinates. Defaults to `numpy.float32`.
+    chunk_size : int
+        Number of steps computed at once. Defaults to `4194304`.
+
+    Returns
+    -------
+    : numpy.array
+        Memory-mapped `NumPy` array of the coordinates corresponding to each step.
+    : numpy.array
+        Lowest coordinates of the walk, along each axis.
+    : numpy.array
+        Highest coordinates of the walk, along each axis.
+    """
+    vectors = _step_vectors(angle_step, dtype)
+    digits = map_digits(source)[first:until]
+
+    points: np.array = np.lib.format.open_memmap(
+        filename, mode="w+", dtype=dtype, shape=(digits.shape[0] + 1, 2)
+    )
+    points[0] = 0
+
+    lo: np.array = np.zeros(2, dtype=dtype)
+    hi: np.array = np.zeros(2, dtype=dtype)
+
+    for i in range(0, digits.shape[0], chunk_size):
+        j = min(i + chunk_size, digits.shape[0])
+
+        steps = vectors[digits[i:j] - ord("0")]
+        steps[0] += points[i]
+        np.cumsum(steps, axis=0, dtype=dtype, out=points[i + 1 : j + 1])
+
+        np.minimum(lo, np.min(points[i + 1 : j + 1], axis=0), out=lo)
+        np.maximum(hi, np.max(points[i + 1 : j + 1], axis=0), out=hi)
+
+    points.flush()
+
+    return points, lo, hi
+
+
 def rescale_coordinates(
     points: np.array,
     min_width: int = None,
@@ -239,6 +590,62 @@ def rescale_coordinates(
     : numpy.array
         `NumPy` array of the rescaled coordinates corresponding to each step.
 
+    Raises
+    ------
+    : ValueError
+        If none of `max_width` or `max_height` is defined.
+    """
+    shift, factor = _rescale_factors(
+        np.max(points[:,0]),
+        np.max(points[:,1]),
+        min_width,
+        max_width,
+        min_height,
+        max_height,
+        keep_ratio,
+    )
+
+    points += shift
+    points *= factor
+
+    return points
+
+
+def _rescale_factors(
+    xmax: float,
+    ymax: float,
+    min_width: int = None,
+    max_width: int = None,
+    min_height: int = None,
+    max_height: int = None,
+    keep_ratio: bool = True,
+) -> typing.Tuple[typing.Tuple[float, float], typing.Tuple[float, float]]:
+    """Compute the translation and scaling factors of the plot from its extent only.
+
+    Parameters
+    ----------
+    xmax : float
+        Width of the (recentered) plot.
+    ymax : float
+        Height of the (recentered) plot.
+    min_width : int
+        Minimum width of the plot. Defaults to `None`.
+    max_width : int
+        Maximum width of the plot. Defaults to `None`.
+    min_height : int
+        Minimum height of the plot. Defaults to `None`.
+    max_height : int
+        Maximum height of the plot. Defaults to `None`.
+    keep_ratio : bool
+        Make sure not to deform the plot. Defaults to `True`.
+
+    Returns
+    -------
+    : typing.Tuple[float, float]
+        Translation to apply (before scaling) along each axis.
+    : typing.Tuple[float, float]
+        Scaling factor to apply along each axis.
+
     Raises
     ------
     : ValueError
@@ -248,19 +655,19 @@ def rescale_coordinates(
 
     # translate
 
-    xmax = np.max(points[:,0])
-    ymax = np.max(points[:,1])
+    xs, ys = 0, 0
 
     if min_width is not None and xmax < min_width:
-        points[:,0] += (min_width - xmax)/2
+        xs = (min_width - xmax)/2
+        xmax = xmax + xs
 
     if min_height is not None and ymax < min_height:
-        points[:,1] += (min_height - ymax)/2
+        ys = (min_height - ymax)/2
+        ymax = ymax + ys
 
-    # rescale
+    shift = (xs, ys)
 
-    xmax = np.max(points[:,0])
-    ymax = np.max(points[:,1])
+    # rescale
 
     if max_width is not None and max_height is not None:
         xf = max_width/xmax
@@ -285,16 +692,275 @@ def rescale_coordinates(
     else:
         raise ValueError('Provide at least one of "max_width" or "max_height".')
 
-    points *= factor
+    return shift, factor
 
-    return points
+
+class _Rescaled:
+    """Rescale a walk, lazily, as its chunks are accessed.
+
+    All the renderers read the coordinates one chunk at a time; each chunk is rescaled
+    on its own copy, the stored walk is left untouched.
+    """
+
+    def __init__(
+        self,
+        points: np.array,
+        lo: np.array,
+        shift: typing.Tuple[float, float],
+        factor: typing.Tuple[float, float],
+    ):
+        self.points = points
+        self.lo = lo
+        self.shift = shift
+        self.factor = factor
+
+    def __len__(self) -> int:
+        return self.points.shape[0]
+
+    def __getitem__(self, key: typing.Any) -> np.array:
+        chunk = np.array(self.points[key])
+        chunk -= self.lo
+        chunk += self.shift
+        chunk *= self.factor
+
+        return chunk
+
+
+def rescale_walk(
+    points: np.array,
+    lo: np.array,
+    hi: np.array,
+    min_width: int = None,
+    max_width: int = None,
+    min_height: int = None,
+    max_height: int = None,
+    keep_ratio: bool = True,
+) -> typing.Tuple[typing.Any, typing.Tuple[float, float]]:
+    """Recenter and rescale a walk computed via `walk_coordinates()`, lazily.
+
+    The transformation is derived from the bounding box alone; the coordinates are
+    only rescaled when read by the renderer, chunk by chunk, and never written back.
+    The outcome is the same as `compute_coordinates()` followed by
+    `rescale_coordinates()`.
+
+    Parameters
+    ----------
+    points : numpy.array
+        Memory-mapped `NumPy` array of the coordinates corresponding to each step.
+    lo : numpy.array
+        Lowest coordinates of the walk, along each axis.
+    hi : numpy.array
+        Highest coordinates of the walk, along each axis.
+    min_width : int
+        Minimum width of the plot. Defaults to `None`.
+    max_width : int
+        Maximum width of the plot. Defaults to `None`.
+    min_height : int
+        Minimum height of the plot. Defaults to `None`.
+    max_height : int
+        Maximum height of the plot. Defaults to `None`.
+    keep_ratio : bool
+        Make sure not to deform the plot. Defaults to `True`.
+
+    Returns
+    -------
+    : typing.Any
+        Sliceable object returning the rescaled coordinates of consecutive chunks.
+    : typing.Tuple[float, float]
+        Width and height of the rescaled plot.
+    """
+    extent = hi - lo
+    shift, factor = _rescale_factors(
+        extent[0],
+        extent[1],
+        min_width,
+        max_width,
+        min_height,
+        max_height,
+        keep_ratio,
+    )
+
+    return _Rescaled(points, lo, shift, factor), tuple((extent + shift) * factor)
+
+
+def _line_format(styles: typing.Dict[str, str]) -> str:
+    """Turn the `<line>` template into a `printf`-style format, styles included.
+
+    Parameters
+    ----------
+    styles : typing.Dict[str, str]
+        Extra styling options for the lines.
+
+    Returns
+    -------
+    : str
+        Format expecting the `x1`, `y1`, `x2`, `y2` coordinates and the color.
+    """
+    return svg_line.substitute(
+        color="%s",
+        styles=" ".join([f'{k}="{v}"' for k, v in styles.items()]).replace("%", "%%"),
+        x1="%.4f",
+        x2="%.4f",
+        y1="%.4f",
+        y2="%.4f",
+    )
+
+
+def step_colors(
+    digits: np.array, colors: np.array, per_digit: bool, steps: np.array = None
+) -> np.array:
+    """Pick the color of each step of the walk.
+
+    Parameters
+    ----------
+    digits : numpy.array
+        `NumPy` array of the decimal digits.
+    colors : numpy.array
+        `NumPy` array (`uint8`) of shape `(N, 3)`, one color for each digit, or colors
+        interpolated from the defined gradient.
+    per_digit : bool
+        Whether the colors are one for each digit, or one for each step (see
+        `color_scheme()`).
+    steps : numpy.array
+        Indices of the steps to consider. Defaults to `None` (all steps).
+
+    Returns
+    -------
+    : numpy.array
+        `NumPy` array (`uint8`) of shape `(len(steps), 3)`, the color of each step.
+    """
+    steps = slice(0, digits.shape[0]) if steps is None else steps
+
+    if per_digit:
+        return colors[digits[steps]]
+
+    return colors[steps]
+
+
+def iter_plot(
+    digits: np.array,
+    points: np.array,
+    colors: np.array,
+    styles: typing.Dict[str, str],
+    chunk_size: int = 65536,
+    per_digit: bool = False,
+) -> typing.Iterator[str]:
+    """Render the random walk plot using `SVG` `<line>`s, one chunk at a time.
+
+    Each chunk of segments is gathered in a single `NumPy` (object) array and formatted
+    in one go, instead of substituting the template segment by segment. The colors are
+    only picked (and stringified) for the chunk at hand.
+
+    Parameters
+    ----------
+    digits : numpy.array
+        `NumPy` array of the decimal digits.
+    points : numpy.array
+        `NumPy` array of the coordinates corresponding to each step.
+    colors : numpy.array
+        `NumPy` array (`uint8`) of shape `(N, 3)`, one color for each digit, or colors
+        interpolated from the defined gradient.
+    styles : typing.Dict[str, str]
+        Extra styling options for the lines.
+    chunk_size : int
+        Number of `<line>`s rendered at once. Defaults to `65536`.
+    per_digit : bool
+        Whether the colors are one for each digit, or one for each step (see
+        `color_scheme()`). Defaults to `False`.
+
+    Yields
+    ------
+    : str
+        Rendered and collated `<line>`s corresponding to a chunk of steps.
+    """
+    line = _line_format(styles)
+
+    for i in range(0, digits.shape[0], chunk_size):
+        j = min(i + chunk_size, digits.shape[0])
+        codes, steps = color_codes(step_colors(digits, colors, per_digit, slice(i, j)))
+
+        values: np.array = np.empty((j - i, 5), dtype=object)
+        values[:, 0:2] = points[i:j]
+        values[:, 2:4] = points[i + 1 : j + 1]
+        values[:, 4] = codes[steps]
+
+        yield (line * (j - i)) % tuple(values.ravel())
+
+
+def iter_path(
+    digits: np.array,
+    points: np.array,
+    colors: np.array,
+    chunk_size: int = 65536,
+    per_digit: bool = False,
+) -> typing.Iterator[str]:
+    """Render the random walk plot using `SVG` `<path>`s, one chunk at a time.
+
+    Consecutive steps sharing the same color are collapsed into a single `<path>`
+    element. The styles are not repeated: the paths are meant to be wrapped in a `<g>`
+    element carrying them (see `write_plot()`). The last run of a chunk may go on in
+    the next one: it is carried over, the chunk growing until a run ends.
+
+    Parameters
+    ----------
+    digits : numpy.array
+        `NumPy` array of the decimal digits.
+    points : numpy.array
+        `NumPy` array of the coordinates corresponding to each step.
+    colors : numpy.array
+        `NumPy` array (`uint8`) of shape `(N, 3)`, one color for each digit, or colors
+        interpolated from the defined gradient.
+    chunk_size : int
+        Approximate number of steps rendered at once. Defaults to `65536`.
+    per_digit : bool
+        Whether the colors are one for each digit, or one for each step (see
+        `color_scheme()`). Defaults to `False`.
+
+    Yields
+    ------
+    : str
+        Rendered and collated `<path>`s corresponding to a chunk of steps.
+    """
+    path = svg_path.substitute(d="M%sL%s", color="%s")
+
+    i, size = 0, chunk_size
+    while i < digits.shape[0]:
+        j = min(i + size, digits.shape[0])
+        codes, steps = color_codes(step_colors(digits, colors, per_digit, slice(i, j)))
+
+        # boundaries of the runs of identical colors
+        bounds = np.flatnonzero(steps[1:] != steps[:-1]) + 1
+
+        # the last run is left for the next chunk, unless it is the only one
+        if j < digits.shape[0]:
+            if bounds.shape[0] == 0:
+                size *= 2
+                continue
+            j = i + int(bounds[-1])
+            bounds = bounds[:-1]
+
+        bounds = np.concatenate(([0], bounds, [j - i])).tolist()
+        size = chunk_size
+
+        # format all the points of the chunk at once, then slice them run by run
+        coords = "%.4f %.4f\n" * (j - i + 1)
+        coords = (coords % tuple(points[i : j + 1].ravel().tolist())).split("\n")
+
+        values: typing.List[str] = []
+        for m, n in zip(bounds[:-1], bounds[1:]):
+            values += [coords[m], " ".join(coords[m + 1 : n + 1]), codes[steps[m]]]
+
+        yield (path * (len(bounds) - 1)) % tuple(values)
+
+        i = j
 
 
 def render_plot(
     digits: np.array,
     points: np.array,
-    colors: typing.List[str],
+    colors: np.array,
     styles: typing.Dict[str, str],
+    per_digit: bool = False,
 ) -> str:
     """Render the random walk plot using `SVG` `<line>`s.
 
@@ -304,55 +970,174 @@ def render_plot(
         `NumPy` array of the decimal digits.
     points : numpy.array
         `NumPy` array of the coordinates corresponding to each step.
-    colors : typing.List[str]
-        List of colors, one for each digit, or list of colors interpolated from the
-        defined gradient.
+    colors : numpy.array
+        `NumPy` array (`uint8`) of shape `(N, 3)`, one color for each digit, or colors
+        interpolated from the defined gradient.
     styles : typing.Dict[str, str]
         Extra styling options for the lines.
+    per_digit : bool
+        Whether the colors are one for each digit, or one for each step (see
+        `color_scheme()`). Defaults to `False`.
 
     Returns
     -------
     : str
         Rendered and collated `<line>`s corresponding to each step.
     """
-    lines: typing.List[str] = []
-
-    for n, d in enumerate(digits):
-        x1, y1 = points[n]
-        x2, y2 = points[n + 1]
-
-        try:
-            color = colors[n]
-        except KeyError:
-            color = colors[d]
-
-        lines.append(
-            svg_line.substitute(
-                color=color,
-                styles=" ".join([f'{k}="{v}"' for k, v in styles.items()]),
-                x1=f"{x1:.4f}",
-                x2=f"{x2:.4f}",
-                y1=f"{y1:.4f}",
-                y2=f"{y2:.4f}",
-            )
+    return "".join(iter_plot(digits, points, colors, styles, per_digit=per_digit))
+
+
+def write_plot(
+    stream: typing.TextIO,
+    digits: np.array,
+    points: np.array,
+    colors: np.array,
+    styles: typing.Dict[str, str],
+    chunk_size: int = 65536,
+    mode: str = "line",
+    size: typing.Tuple[float, float] = None,
+    per_digit: bool = False,
+):
+    """Stream the whole `SVG` file to a file-like object.
+
+    The header, each chunk of elements, and the footer are written as soon as they are
+    rendered; memory usage does not depend on the number of digits.
+
+    Parameters
+    ----------
+    stream : typing.TextIO
+        File-like object to write to (`sys.stdout`, opened file, `io.StringIO`...).
+    digits : numpy.array
+        `NumPy` array of the decimal digits.
+    points : numpy.array
+        `NumPy` array of the coordinates corresponding to each step.
+    colors : numpy.array
+        `NumPy` array (`uint8`) of shape `(N, 3)`, one color for each digit, or colors
+        interpolated from the defined gradient.
+    styles : typing.Dict[str, str]
+        Extra styling options for the lines.
+    chunk_size : int
+        Number of steps rendered at once. Defaults to `65536`.
+    mode : str
+        One `<line>` per step (`"line"`), or one `<path>` per run of steps sharing the
+        same color, wrapped in a `<g>` carrying the styles (`"path"`). Defaults to
+        `"line"`.
+    size : typing.Tuple[float, float]
+        Width and height of the plot, if known. Defaults to `None` (computed from the
+        coordinates).
+    per_digit : bool
+        Whether the colors are one for each digit, or one for each step (see
+        `color_scheme()`). Defaults to `False`.
+
+    Raises
+    ------
+    : NotImplementedError
+        If the mode is unknown.
+    """
+    if size is None:
+        size = (np.max(points[:,0]), np.max(points[:,1]))
+
+    header, footer = svg.safe_substitute(
+        width=f"{size[0]:.0f}px",
+        height=f"{size[1]:.0f}px",
+    ).split("$plot")
+
+    if mode == "line":
+        chunks = iter_plot(digits, points, colors, styles, chunk_size, per_digit)
+
+    elif mode == "path":
+        # round joins mimic the overlapping extremities of the individual lines
+        styles = {"fill": "none", "stroke-linejoin": "round", **styles}
+        group, closing = svg_group.safe_substitute(
+            styles=" ".join([f'{k}="{v}"' for k, v in styles.items()])
+        ).split("$plot")
+
+        header, footer = header + group, closing + footer
+        chunks = iter_path(digits, points, colors, chunk_size, per_digit)
+
+    else:
+        raise NotImplementedError(f'Mode "{mode}" is unknown.')
+
+    stream.write(header)
+    for chunk in chunks:
+        stream.write(chunk)
+    stream.write(footer)
+
+
+def render_config(
+    stream: typing.BinaryIO,
+    config: typing.Dict[str, typing.Any],
+    digits: np.array = None,
+):
+    """Render the plot described by a configuration to a file-like object.
+
+    Parameters
+    ----------
+    stream : typing.BinaryIO
+        File-like object to write to (`sys.stdout.buffer`, file opened in binary mode,
+        `io.BytesIO`...).
+    config : typing.Dict[str, typing.Any]
+        Dictionary of the configuration options.
+    digits : numpy.array
+        `NumPy` array of the decimal digits, if already loaded. Defaults to `None`
+        (fetched as described in the configuration).
+
+    Raises
+    ------
+    : ValueError
+        If the configuration is invalid (see `check_config()`).
+    """
+    check_config(config)
+
+    formats = config["plot"].get("format", {}).copy()
+    mode = formats.pop("mode", "line")
+    walk = formats.pop("walk", None)
+
+    # out-of-core, the digits and the colors are only read or computed chunk by chunk
+    if digits is None:
+        data = config["plot"]["data"]
+        if walk is None:
+            digits = fetch_digits(**data)
+        else:
+            digits = _Digits(map_digits(data["source"])[data["first"] : data["until"]])
+    if "gradient_start" in config["plot"]["color"]:
+        colors, per_digit = color_scheme(
+            **config["plot"]["color"],
+            gradient_steps=digits.shape[0],
+            lazy=walk is not None,
         )
+    else:
+        colors, per_digit = color_scheme(color_codes_10=config["plot"]["color"])
+
+    if walk is None:
+        points = compute_coordinates(digits)
+        points = rescale_coordinates(points, **formats)
+        size = None
+    else:
+        points, lo, hi = walk_coordinates(**config["plot"]["data"], filename=walk)
+        points, size = rescale_walk(points, lo, hi, **formats)
 
-    return "".join(lines)
+    styles = config["plot"]["style"]
+
+    if mode == "png":
+        raster.write_png(
+            stream, digits, points, colors, styles, size=size, per_digit=per_digit
+        )
+    else:
+        text = io.TextIOWrapper(stream, encoding="utf-8")
+        write_plot(
+            text,
+            digits,
+            points,
+            colors,
+            styles,
+            mode=mode,
+            size=size,
+            per_digit=per_digit,
+        )
+        text.flush()
+        text.detach()
 
 
 if __name__ == "__main__":
-    config = fetch_config(sys.argv[1])
-
-    digits = fetch_digits(**config["plot"]["data"])
-    colors = color_scheme(**config["plot"]["color"], gradient_steps=digits.shape[0])
-
-    points = compute_coordinates(digits)
-    points = rescale_coordinates(points, **(config["plot"].get("format", {})))
-    
-    sys.stdout.write(
-        svg.substitute(
-            width=f"{np.max(points[:,0]):.0f}px",
-            height=f"{np.max(points[:,1]):.0f}px",
-            plot=render_plot(digits, points, colors, config["plot"]["style"]),
-        ).strip()
-    )
+    render_config(sys.stdout.buffer, fetch_config(sys.argv[1]))
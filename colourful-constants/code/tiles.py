@@ -0,0 +1,724 @@
+"""Tiled, multi-resolution rendering of (very) long random walks.
+
+Tens of millions of steps do not fit in a single picture; better explore them like a
+map. The walk is computed once, its segments indexed by the tile they fall in, and a
+zoom pyramid of `256x256` `PNG` tiles is rendered on demand (and cached on disk):
+
+* the lowest zoom levels are downsampled from a coarse density grid, rasterized once
+  from all the segments,
+* the highest zoom levels are rasterized from the segments of the tile only, fetched
+  from the spatial index.
+
+The spatial index is nothing more than the segments sorted by the
+[Z-order](https://en.wikipedia.org/wiki/Z-order_curve) key of the tile (at the highest
+zoom level) their middle falls in: the segments of any tile, at any zoom level, are
+then a contiguous slice of the sorted segments.
+
+Run with:
+
+```bash
+$ .venv/bin/python code/tiles.py configs/pi-1M.yaml cache/pi-1M 8000
+```
+
+and browse to [http://localhost:8000](http://localhost:8000). Tiles are available at
+`http://localhost:8000/{z}/{x}/{y}.png`.
+
+Attributes
+----------
+tile_size : int
+    Width and height of a tile, in pixels.
+page : string.Template
+    Template to render the (`Leaflet`-based) viewer. Variables substituted:
+    - `max_zoom`: highest zoom level of the pyramid.
+"""
+
+import http.server
+import os
+import string
+import sys
+import tempfile
+import threading
+import typing
+
+import numpy as np
+import yaml
+
+import raster
+import svg
+
+tile_size: int = 256
+
+page: string.Template = string.Template(
+    "<!DOCTYPE html>"
+    "<html>"
+    "<head>"
+    '<link rel="stylesheet" href="https://unpkg.com/leaflet@1.9.4/dist/leaflet.css" />'
+    '<script src="https://unpkg.com/leaflet@1.9.4/dist/leaflet.js"></script>'
+    "<style>html, body, #map { height: 100%; margin: 0; }</style>"
+    "</head>"
+    "<body>"
+    '<div id="map"></div>'
+    "<script>"
+    "const map = L.map('map', {crs: L.CRS.Simple, minZoom: 0, maxZoom: $max_zoom});"
+    "L.tileLayer('/{z}/{x}/{y}.png', {minZoom: 0, maxZoom: $max_zoom}).addTo(map);"
+    "map.setView(map.unproject([128, 128], 0), 1);"
+    "</script>"
+    "</body>"
+    "</html>"
+)
+
+
+# a fixed pool of locks, shared (by hash) among the cached files, so that concurrent
+# requests render each file once; reentrant, a tile of the lowest zoom levels holding
+# its lock while fetching the density grid (which may hash to the same one)
+_locks: typing.List[typing.ContextManager] = [threading.RLock() for _ in range(64)]
+
+
+def _lock(filename: str) -> typing.ContextManager:
+    """Get the lock guarding the rendering of a cached file.
+
+    Parameters
+    ----------
+    filename : str
+        Filepath to the cached file.
+
+    Returns
+    -------
+    : threading.RLock
+        The lock of this file, from a fixed pool (the memory used does not grow with
+        the number of files).
+    """
+    return _locks[hash(filename) % len(_locks)]
+
+
+def _write_atomic(filename: str, write: typing.Callable[[typing.BinaryIO], None]):
+    """Write a file in one go: readers either find it complete, or not at all.
+
+    The content is written to a temporary file (in the same folder), then moved over.
+
+    Parameters
+    ----------
+    filename : str
+        Filepath to the file to write.
+    write : typing.Callable[[typing.BinaryIO], None]
+        Function writing the content to a file object.
+    """
+    folder = os.path.dirname(filename)
+    os.makedirs(folder, exist_ok=True)
+
+    fd, temporary = tempfile.mkstemp(dir=folder, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            write(f)
+        os.replace(temporary, filename)
+    except BaseException:
+        os.remove(temporary)
+        raise
+
+
+def _spread(v: np.array) -> np.array:
+    """Insert a zero bit in between each bit of (up to) 32-bit integers.
+
+    Parameters
+    ----------
+    v : numpy.array
+        `NumPy` array of integers.
+
+    Returns
+    -------
+    : numpy.array
+        `NumPy` array (`uint64`) of the spread integers.
+    """
+    v = np.asarray(v, dtype=np.uint64)
+
+    for shift, mask in [
+        (16, 0x0000FFFF0000FFFF),
+        (8, 0x00FF00FF00FF00FF),
+        (4, 0x0F0F0F0F0F0F0F0F),
+        (2, 0x3333333333333333),
+        (1, 0x5555555555555555),
+    ]:
+        v = (v | (v << np.uint64(shift))) & np.uint64(mask)
+
+    return v
+
+
+def _morton(x: np.array, y: np.array) -> np.array:
+    """Compute the Z-order key of tile coordinates.
+
+    Parameters
+    ----------
+    x : numpy.array
+        `NumPy` array of the column of each tile.
+    y : numpy.array
+        `NumPy` array of the row of each tile.
+
+    Returns
+    -------
+    : numpy.array
+        `NumPy` array (`uint64`) of the keys.
+    """
+    return _spread(x) | (_spread(y) << np.uint64(1))
+
+
+def _segment_keys(
+    points: np.array, first: int, until: int, scale: float, max_zoom: int
+) -> np.array:
+    """Compute the keys of a window of segments: the tile their middle is in.
+
+    Parameters
+    ----------
+    points : numpy.array
+        `NumPy` array of the (recentered) coordinates corresponding to each step.
+    first : int
+        First segment to consider.
+    until : int
+        Last segment to consider.
+    scale : float
+        Number of pixels per unit of the coordinates, at the highest zoom level.
+    max_zoom : int
+        Highest zoom level.
+
+    Returns
+    -------
+    : numpy.array
+        `NumPy` array (`uint64`) of the Morton codes of the tiles (at the highest zoom
+        level) the middle of each segment is in.
+    """
+    middle = (points[first:until] + points[first + 1 : until + 1]) / 2
+    middle = np.floor(middle * scale / tile_size)
+    middle = np.clip(middle, 0, 2**max_zoom - 1).astype(np.uint64)
+
+    return _morton(middle[:, 0], middle[:, 1])
+
+
+def _index_segments(
+    points: np.array,
+    scale: float,
+    max_zoom: int,
+    cache: str,
+    chunk_size: int = 1 << 22,
+    max_buckets: int = 1 << 20,
+):
+    """Sort the segments by key, out-of-core, into memory-mapped `.npy` files.
+
+    A bucket pass: the keys are computed one chunk at a time to count the segments in
+    each bucket (range of keys), then again to scatter them to their bucket in the
+    output files, and the buckets finally sorted a few at a time. The segments of a
+    bucket are scattered in order, so that the result is the same as a stable sort.
+
+    Parameters
+    ----------
+    points : numpy.array
+        `NumPy` array of the (recentered) coordinates corresponding to each step.
+    scale : float
+        Number of pixels per unit of the coordinates, at the highest zoom level.
+    max_zoom : int
+        Highest zoom level.
+    cache : str
+        Path to the folder to store the sorted keys (`keys.npy`) and the corresponding
+        segments (`order.npy`) in.
+    chunk_size : int
+        Number of segments processed at once (unless a single bucket holds more).
+        Defaults to `4194304`.
+    max_buckets : int
+        Maximum number of buckets. Defaults to `1048576`.
+    """
+    n = points.shape[0] - 1
+    shift = max(0, 2 * max_zoom - int(np.log2(max_buckets)))
+    buckets = 1 << (2 * max_zoom - shift)
+
+    def windows():
+        for i in range(0, n, chunk_size):
+            j = min(i + chunk_size, n)
+            keys = _segment_keys(points, i, j, scale, max_zoom)
+            yield i, keys, (keys >> np.uint64(shift)).astype(np.int64)
+
+    counts = np.zeros(buckets, dtype=np.int64)
+    for _, _, bucket in windows():
+        counts += np.bincount(bucket, minlength=buckets)
+    bounds = np.concatenate(([0], np.cumsum(counts)))
+
+    keys: np.array = np.lib.format.open_memmap(
+        os.path.join(cache, "keys.npy"), mode="w+", dtype=np.uint64, shape=(n,)
+    )
+    order: np.array = np.lib.format.open_memmap(
+        os.path.join(cache, "order.npy"), mode="w+", dtype=np.uint32, shape=(n,)
+    )
+
+    cursor = bounds[:-1].copy()
+    for i, window, bucket in windows():
+        perm = np.argsort(bucket, kind="stable")
+        ranked = bucket[perm]
+        # position of each segment among the ones of its bucket in this window
+        rank = np.arange(ranked.shape[0]) - np.searchsorted(ranked, ranked)
+        target = cursor[ranked] + rank
+        keys[target] = window[perm]
+        order[target] = perm + i
+        cursor += np.bincount(bucket, minlength=buckets)
+
+    # whole buckets at once, the keys of the next ones being all higher
+    a = 0
+    while a < n:
+        b = bounds[np.searchsorted(bounds, a + chunk_size, side="right") - 1]
+        if b <= a:
+            b = bounds[np.searchsorted(bounds, a, side="right")]
+
+        perm = np.argsort(keys[a:b], kind="stable")
+        keys[a:b] = keys[a:b][perm]
+        order[a:b] = order[a:b][perm]
+        a = b
+
+    keys.flush()
+    order.flush()
+
+
+def build_pyramid(
+    config: typing.Dict[str, typing.Any],
+    cache: str,
+    pixels_per_step: float = 8.0,
+    density_size: int = 4096,
+    chunk_size: int = 1 << 22,
+) -> typing.Dict[str, typing.Any]:
+    """Compute the walk and its spatial index, once, and store them on disk.
+
+    Everything is computed out-of-core, one chunk at a time: the walk straight to a
+    memory-mapped file (see `svg.walk_coordinates()`), and the index sorted in buckets
+    (see `_index_segments()`). The colors are not stored, but interpolated as accessed.
+
+    Parameters
+    ----------
+    config : typing.Dict[str, typing.Any]
+        Dictionary of the configuration options (see `svg`).
+    cache : str
+        Path to the folder to store the walk, the index and the tiles in.
+    pixels_per_step : float
+        Length of a step at the highest zoom level, in pixels. Defaults to `8.0`.
+    density_size : int
+        Maximum width and height of the density grid the lowest zoom levels are
+        downsampled from, in pixels. Defaults to `4096`.
+    chunk_size : int
+        Number of steps processed at once. Defaults to `4194304`.
+
+    Returns
+    -------
+    : typing.Dict[str, typing.Any]
+        Description of the pyramid (see `load_pyramid()`).
+    """
+    svg.check_config(config)
+    os.makedirs(cache, exist_ok=True)
+
+    # single precision drifts over tens of millions of steps
+    points, lo, hi = svg.walk_coordinates(
+        **config["plot"]["data"],
+        filename=os.path.join(cache, "points.npy"),
+        dtype=np.float64,
+        chunk_size=chunk_size,
+    )
+    for i in range(0, points.shape[0], chunk_size):
+        points[i : i + chunk_size] -= lo
+    points.flush()
+    extent = float(np.max(hi - lo)) + 1.0
+
+    max_zoom = max(0, int(np.ceil(np.log2(pixels_per_step * extent / tile_size))))
+    density_zoom = min(max_zoom, int(np.log2(density_size / tile_size)))
+
+    # index the segments by the tile (at the highest zoom level) their middle is in
+    scale = tile_size * 2**max_zoom / extent
+    _index_segments(points, scale, max_zoom, cache, chunk_size)
+
+    with open(os.path.join(cache, "pyramid.yaml"), "w") as f:
+        yaml.dump(
+            {
+                "data": config["plot"]["data"],
+                "color": config["plot"]["color"],
+                "width": float(config["plot"].get("style", {}).get("stroke-width", 1)),
+                "extent": extent,
+                "max_zoom": max_zoom,
+                "density_zoom": density_zoom,
+            },
+            f,
+        )
+
+    return load_pyramid(cache)
+
+
+def load_pyramid(cache: str) -> typing.Dict[str, typing.Any]:
+    """Load (memory-map) a pyramid previously built via `build_pyramid()`.
+
+    Parameters
+    ----------
+    cache : str
+        Path to the folder the walk, the index and the tiles are stored in.
+
+    Returns
+    -------
+    : typing.Dict[str, typing.Any]
+        Description of the pyramid: the options used to build it, the (memory-mapped)
+        `points`, `keys` and `order` arrays, and the `digits` and `colors` (read and
+        interpolated as accessed).
+
+    Raises
+    ------
+    : FileNotFoundError
+        If no pyramid was built in this folder.
+    """
+    pyramid = svg.fetch_config(os.path.join(cache, "pyramid.yaml"))
+
+    pyramid["cache"] = cache
+    data = pyramid["data"]
+    pyramid["digits"] = svg._Digits(
+        svg.map_digits(data["source"])[data["first"] : data["until"]]
+    )
+    for name in ["points", "keys", "order"]:
+        pyramid[name] = np.load(os.path.join(cache, f"{name}.npy"), mmap_mode="r")
+
+    # built before the color scheme was recorded: gradients only, stored
+    if "color" not in pyramid:
+        pyramid["colors"] = np.load(os.path.join(cache, "colors.npy"), mmap_mode="r")
+        pyramid.setdefault("per_digit", False)
+    elif "gradient_start" in pyramid["color"]:
+        pyramid["colors"], pyramid["per_digit"] = svg.color_scheme(
+            **pyramid["color"], gradient_steps=data["until"] - data["first"], lazy=True
+        )
+    else:
+        pyramid["colors"], pyramid["per_digit"] = svg.color_scheme(
+            color_codes_10=pyramid["color"]
+        )
+
+    return pyramid
+
+
+def fetch_density(
+    pyramid: typing.Dict[str, typing.Any], chunk_size: int = 1 << 20
+) -> np.array:
+    """Rasterize (once) all the segments in the coarse density grid.
+
+    Each pixel of the grid stores its coverage and the average color of the segments
+    going through it, weighted by their area.
+
+    Parameters
+    ----------
+    pyramid : typing.Dict[str, typing.Any]
+        Description of the pyramid (see `load_pyramid()`).
+    chunk_size : int
+        Number of segments rasterized at once. Defaults to `1048576`.
+
+    Returns
+    -------
+    : numpy.array
+        `NumPy` array (`float32`) of shape `(size, size, 4)`: coverage (between `0` and
+        `1`) and `RGB` components (between `0` and `255`) of each pixel.
+    """
+    filename = os.path.join(pyramid["cache"], "density.npy")
+
+    try:
+        return np.load(filename, mmap_mode="r")
+    except FileNotFoundError:
+        pass
+
+    with _lock(filename):
+        # rendered by another request in the meantime
+        if not os.path.exists(filename):
+            density = _render_density(pyramid, chunk_size)
+            _write_atomic(filename, lambda f: np.save(f, density))
+
+    return np.load(filename, mmap_mode="r")
+
+
+def _render_density(
+    pyramid: typing.Dict[str, typing.Any], chunk_size: int = 1 << 20
+) -> np.array:
+    """Rasterize all the segments in the coarse density grid (see `fetch_density()`).
+
+    Parameters
+    ----------
+    pyramid : typing.Dict[str, typing.Any]
+        Description of the pyramid (see `load_pyramid()`).
+    chunk_size : int
+        Number of segments rasterized at once. Defaults to `1048576`.
+
+    Returns
+    -------
+    : numpy.array
+        `NumPy` array (`float32`) of shape `(size, size, 4)`.
+    """
+    size = tile_size * 2 ** pyramid["density_zoom"]
+    scale = size / pyramid["extent"]
+    points, digits, colors = pyramid["points"], pyramid["digits"], pyramid["colors"]
+
+    sums: np.array = np.zeros((4, size * size), dtype=np.float64)
+
+    for i in range(0, digits.shape[0], chunk_size):
+        j = min(i + chunk_size, digits.shape[0])
+
+        index, area, segment = raster.sample_segments(
+            points[i:j] * scale,
+            points[i + 1 : j + 1] * scale,
+            (size, size),
+            pyramid["width"],
+        )
+        # one color per segment (interpolated once), then per sample
+        rgb = svg.step_colors(digits, colors, pyramid["per_digit"], slice(i, j))
+        rgb = rgb[segment]
+
+        sums[0] += np.bincount(index, weights=area, minlength=size * size)
+        for c in range(3):
+            sums[c + 1] += np.bincount(
+                index, weights=area * rgb[:, c], minlength=size * size
+            )
+
+    density: np.array = np.zeros((size * size, 4), dtype=np.float32)
+    drawn = sums[0] > 0
+    density[:, 0] = np.clip(sums[0], 0.0, 1.0)
+    density[drawn, 1:] = (sums[1:, drawn] / sums[0, drawn]).T
+
+    return density.reshape((size, size, 4))
+
+
+def _segments(
+    pyramid: typing.Dict[str, typing.Any], z: int, x: int, y: int
+) -> np.array:
+    """Fetch the segments of a tile, and of the tiles around it, from the index.
+
+    Parameters
+    ----------
+    pyramid : typing.Dict[str, typing.Any]
+        Description of the pyramid (see `load_pyramid()`).
+    z : int
+        Zoom level.
+    x : int
+        Column of the tile.
+    y : int
+        Row of the tile.
+
+    Returns
+    -------
+    : numpy.array
+        `NumPy` array of the (sorted) indices of the segments.
+    """
+    n = 2**z
+    shift = np.uint64(2 * (pyramid["max_zoom"] - z))
+
+    # segments overflowing from the neighbouring tiles are drawn too
+    around = [
+        (i, j)
+        for i in range(max(0, x - 1), min(n, x + 2))
+        for j in range(max(0, y - 1), min(n, y + 2))
+    ]
+
+    first = _morton(*np.array(around).T) << shift
+    until = (_morton(*np.array(around).T) + np.uint64(1)) << shift
+
+    bounds = np.searchsorted(pyramid["keys"], np.concatenate((first, until)))
+    slices = [
+        pyramid["order"][a:b]
+        for a, b in zip(bounds[: len(around)], bounds[len(around) :])
+    ]
+
+    return np.sort(np.concatenate(slices).astype(np.int64))
+
+
+def _inside(pyramid: typing.Dict[str, typing.Any], z: int, x: int, y: int) -> bool:
+    """Check whether a tile belongs to the pyramid.
+
+    Parameters
+    ----------
+    pyramid : typing.Dict[str, typing.Any]
+        Description of the pyramid (see `load_pyramid()`).
+    z : int
+        Zoom level.
+    x : int
+        Column of the tile.
+    y : int
+        Row of the tile.
+
+    Returns
+    -------
+    : bool
+        Whether the zoom level and the column and row of the tile are in range.
+    """
+    return 0 <= z <= pyramid["max_zoom"] and 0 <= x < 2**z and 0 <= y < 2**z
+
+
+def render_tile(
+    pyramid: typing.Dict[str, typing.Any],
+    z: int,
+    x: int,
+    y: int,
+    chunk_size: int = 65536,
+) -> np.array:
+    """Render a single tile of the pyramid.
+
+    Parameters
+    ----------
+    pyramid : typing.Dict[str, typing.Any]
+        Description of the pyramid (see `load_pyramid()`).
+    z : int
+        Zoom level.
+    x : int
+        Column of the tile.
+    y : int
+        Row of the tile.
+    chunk_size : int
+        Number of segments rasterized at once. Defaults to `65536`.
+
+    Returns
+    -------
+    : numpy.array
+        `NumPy` array (`uint8`) of shape `(256, 256, 4)`.
+
+    Raises
+    ------
+    : ValueError
+        If the tile is outside the pyramid.
+    """
+    if not _inside(pyramid, z, x, y):
+        raise ValueError(f"Tile {z}/{x}/{y} is outside the pyramid.")
+
+    # lowest zoom levels: average blocks of the density grid
+    if z <= pyramid["density_zoom"]:
+        f = 2 ** (pyramid["density_zoom"] - z)
+        block = fetch_density(pyramid)[
+            y * tile_size * f : (y + 1) * tile_size * f,
+            x * tile_size * f : (x + 1) * tile_size * f,
+        ]
+        block = np.asarray(block, dtype=np.float64).reshape(
+            (tile_size, f, tile_size, f, 4)
+        )
+
+        coverage = block[..., 0].sum(axis=(1, 3))
+        rgb = (block[..., 1:] * block[..., :1]).sum(axis=(1, 3))
+        rgb /= np.maximum(coverage, 1e-12)[..., None]
+
+        canvas: np.array = np.zeros((tile_size, tile_size, 4), dtype=np.uint8)
+        canvas[..., :3] = np.round(rgb).astype(np.uint8)
+        canvas[..., 3] = np.round(coverage / f**2 * 255).astype(np.uint8)
+
+        return canvas
+
+    # highest zoom levels: rasterize the segments around
+    scale = tile_size * 2**z / pyramid["extent"]
+    origin = np.array([x, y]) * tile_size
+    points = pyramid["points"]
+
+    coverage = np.zeros(tile_size * tile_size, dtype=np.float64)
+    owner = np.full(tile_size * tile_size, -1, dtype=np.int64)
+
+    segments = _segments(pyramid, z, x, y)
+    for i in range(0, segments.shape[0], chunk_size):
+        steps = segments[i : i + chunk_size]
+
+        index, area, segment = raster.sample_segments(
+            points[steps] * scale - origin,
+            points[steps + 1] * scale - origin,
+            (tile_size, tile_size),
+            pyramid["width"],
+        )
+
+        coverage += np.bincount(index, weights=area, minlength=tile_size * tile_size)
+        np.maximum.at(owner, index, steps[segment])
+
+    return raster.compose_canvas(
+        coverage,
+        owner,
+        pyramid["digits"],
+        pyramid["colors"],
+        (tile_size, tile_size),
+        pyramid["per_digit"],
+    )
+
+
+def fetch_tile(pyramid: typing.Dict[str, typing.Any], z: int, x: int, y: int) -> bytes:
+    """Fetch a tile of the pyramid as a `PNG` file, rendering it if not cached yet.
+
+    Parameters
+    ----------
+    pyramid : typing.Dict[str, typing.Any]
+        Description of the pyramid (see `load_pyramid()`).
+    z : int
+        Zoom level.
+    x : int
+        Column of the tile.
+    y : int
+        Row of the tile.
+
+    Returns
+    -------
+    : bytes
+        Content of the `PNG` file.
+    """
+    filename = os.path.join(pyramid["cache"], "tiles", str(z), str(x), f"{y}.png")
+
+    try:
+        with open(filename, "rb") as f:
+            return f.read()
+    except FileNotFoundError:
+        pass
+
+    with _lock(filename):
+        # rendered by another request in the meantime
+        try:
+            with open(filename, "rb") as f:
+                return f.read()
+        except FileNotFoundError:
+            content = raster.encode_png(render_tile(pyramid, z, x, y))
+            _write_atomic(filename, lambda f: f.write(content))
+
+    return content
+
+
+def serve(pyramid: typing.Dict[str, typing.Any], port: int = 8000):
+    """Serve the viewer and the tiles over `HTTP`.
+
+    Parameters
+    ----------
+    pyramid : typing.Dict[str, typing.Any]
+        Description of the pyramid (see `load_pyramid()`).
+    port : int
+        Port to listen to. Defaults to `8000`.
+    """
+
+    class Handler(http.server.BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path in ["/", "/index.html"]:
+                kind = "text/html"
+                content = page.substitute(max_zoom=pyramid["max_zoom"]).encode()
+            else:
+                # only a malformed path or a tile outside the pyramid is not found
+                try:
+                    z, x, y = map(
+                        int, self.path.strip("/").replace(".png", "").split("/")
+                    )
+                except ValueError:
+                    self.send_error(404)
+                    return
+
+                if not _inside(pyramid, z, x, y):
+                    self.send_error(404)
+                    return
+
+                kind = "image/png"
+                try:
+                    content = fetch_tile(pyramid, z, x, y)
+                except Exception:
+                    # logged (with the traceback) by the server
+                    self.send_error(500)
+                    raise
+
+            self.send_response(200)
+            self.send_header("Content-Type", kind)
+            self.send_header("Content-Length", str(len(content)))
+            self.end_headers()
+            self.wfile.write(content)
+
+    http.server.ThreadingHTTPServer(("", port), Handler).serve_forever()
+
+
+if __name__ == "__main__":
+    try:
+        pyramid = load_pyramid(sys.argv[2])
+    except FileNotFoundError:
+        pyramid = build_pyramid(svg.fetch_config(sys.argv[1]), sys.argv[2])
+
+    serve(pyramid, int(sys.argv[3]) if len(sys.argv) > 3 else 8000)
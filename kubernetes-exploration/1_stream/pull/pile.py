@@ -1,7 +1,15 @@
 import logging
 import os
+import redis
 import sqlalchemy
+import sqlalchemy.dialects.postgresql
+import sqlalchemy.dialects.sqlite
+import sqlalchemy.exc
 import sqlalchemy.ext.declarative
+import sqlalchemy.orm
+import sqlalchemy.schema
+import threading
+import time
 
 logging.basicConfig(datefmt='%Y/%m/%d %X', format='%(asctime)s: %(message)s', level=os.environ.get('LOG_LEVEL', 'INFO'))
 logger = logging.getLogger(__name__)
@@ -13,6 +21,43 @@ class Data(Base):
     id_ = sqlalchemy.Column(sqlalchemy.String, primary_key=True)
     timestamp = sqlalchemy.Column(sqlalchemy.BigInteger)
     message = sqlalchemy.Column(sqlalchemy.String)
+    # time-bounded queries, ordered by timestamp then identifier (see `rows()`)
+    __table_args__ = (sqlalchemy.Index('ix_data_timestamp_id_', 'timestamp', 'id_'),)
+
+def url():
+    # any database (e.g., sqlite:///pile.db) can stand in for the postgres service
+    if 'DATABASE_URL' in os.environ:
+        return os.environ['DATABASE_URL']
+    user = os.environ['POSTGRES_USER']
+    pssw = os.environ['POSTGRES_PASSWORD']
+    host = os.environ['POSTGRES_HOST']
+    port = os.environ['POSTGRES_PORT']
+    db = os.environ['POSTGRES_DB']
+    return f'postgresql://{user}:{pssw}@{host}:{port}/{db}'
+
+_engine = None
+_lock = threading.Lock()
+
+def shared_engine():
+    # a single (pooled) engine per process, created on first use along with the tables;
+    # if the database cannot be reached (yet), the next call tries again
+    global _engine
+    with _lock:
+        if _engine is None:
+            engine = sqlalchemy.create_engine(url(), pool_pre_ping=True)
+            try:
+                # replicas starting together race to create the same tables (and indexes,
+                # which `create_all` skips when the table is already there)
+                with engine.begin() as connection:
+                    for table in Base.metadata.sorted_tables:
+                        connection.execute(sqlalchemy.schema.CreateTable(table, if_not_exists=True))
+                        for index in table.indexes:
+                            connection.execute(sqlalchemy.schema.CreateIndex(index, if_not_exists=True))
+            except:
+                engine.dispose()
+                raise
+            _engine = engine
+    return _engine
 
 def connect(func):
     def wrapper(*args, **kwargs):
@@ -21,15 +66,13 @@ def connect(func):
             session = kwargs.pop('session')
         except KeyError:
             try:
-                user = os.environ['POSTGRES_USER']
-                pssw = os.environ['POSTGRES_PASSWORD']
-                host = os.environ['POSTGRES_HOST']
-                port = os.environ['POSTGRES_PORT']
-                db = os.environ['POSTGRES_DB']
-                engine = sqlalchemy.create_engine(f'postgresql://{user}:{pssw}@{host}:{port}/{db}')
+                engine = shared_engine()
                 session = sqlalchemy.orm.sessionmaker(engine)()
             except:
                 return False
+            # hand the connection back to the pool once done
+            with session:
+                return func(*args, engine=engine, session=session, **kwargs)
         return func(*args, engine=engine, session=session, **kwargs)
     return wrapper
 
@@ -49,3 +92,126 @@ def query(mapping, since, until, engine=None, session=None):
                   .filter(mapping.timestamp >= since) \
                   .filter(mapping.timestamp <= until) \
                   .all()
+
+def first():
+    # earliest timestamp stored, None if nothing is
+    with shared_engine().connect() as connection:
+        return connection.execute(sqlalchemy.select(sqlalchemy.func.min(Data.__table__.c.timestamp))).scalar()
+
+def rows(since, until, after_id=None, limit=None, size=1000):
+    # plain (id_, timestamp, message) tuples, no ORM objects, ordered by timestamp then
+    # identifier, and read from the database `size` at a time (server-side cursor):
+    # the next page starts right after the last identifier seen (`after_id`)
+    table = Data.__table__
+    statement = sqlalchemy.select(table.c.id_, table.c.timestamp, table.c.message) \
+                          .where(table.c.timestamp >= since) \
+                          .where(table.c.timestamp <= until) \
+                          .order_by(table.c.timestamp, table.c.id_)
+    if limit is not None:
+        statement = statement.limit(limit)
+    # fail here (rather than halfway through the response) if the database is not there
+    connection = shared_engine().connect()
+    try:
+        if after_id is not None:
+            after = connection.execute(
+                sqlalchemy.select(table.c.timestamp).where(table.c.id_ == after_id)
+            ).scalar()
+            # no such record, hence no such page
+            if after is None:
+                raise KeyError(after_id)
+            statement = statement.where(
+                sqlalchemy.tuple_(table.c.timestamp, table.c.id_) > sqlalchemy.tuple_(after, after_id)
+            )
+        result = connection.execution_options(stream_results=True, yield_per=size).execute(statement)
+    except:
+        connection.close()
+        raise
+    def partitions():
+        with connection:
+            yield from result.partitions()
+    return partitions()
+
+class Writer:
+    # buffer the records, and write them in bulk once enough of them (`size`) piled up
+    # or the oldest one waited long enough (`delay`, in seconds; see `tick()`); `notify` is
+    # called with the time span (earliest and latest timestamps) of each batch written
+
+    # the records are kept when the database cannot be reached, and written on a later
+    # attempt, waiting twice as long after each failure (up to `backoff` seconds)
+
+    chunk = 1000  # records per statement, to stay below the limit of bound parameters
+    backoff = 60.0
+
+    def __init__(self, size=100, delay=1.0, engine=None, notify=None):
+        self.size = size
+        self.delay = delay
+        self.engine = engine  # the shared one (see `shared_engine()`) on the first write
+        self.notify = notify
+        self.records = {}
+        self.since = None
+        self.failures = 0
+        self.retry = 0.0  # no attempt to write before then
+
+    def add(self, mapping):
+        if not self.records:
+            self.since = time.monotonic()
+        # same identifier, same record: the latest one wins
+        self.records[mapping.id_] = {
+            'id_': mapping.id_,
+            'timestamp': mapping.timestamp,
+            'message': mapping.message
+        }
+        if len(self.records) >= self.size and time.monotonic() >= self.retry:
+            self.flush()
+
+    def tick(self):
+        now = time.monotonic()
+        if self.records and now - self.since >= self.delay and now >= self.retry:
+            self.flush()
+
+    def write(self, records):
+        if self.engine is None:
+            self.engine = shared_engine()
+        if self.engine.dialect.name == 'postgresql':
+            insert = sqlalchemy.dialects.postgresql.insert
+        else:
+            insert = sqlalchemy.dialects.sqlite.insert
+        with self.engine.begin() as connection:
+            for i in range(0, len(records), self.chunk):
+                statement = insert(Data.__table__).values(records[i:i + self.chunk])
+                connection.execute(statement.on_conflict_do_update(
+                    index_elements=['id_'],
+                    set_={
+                        'timestamp': statement.excluded.timestamp,
+                        'message': statement.excluded.message
+                    }
+                ))
+
+    def flush(self):
+        if not self.records:
+            return True
+        records = list(self.records.values())
+        try:
+            self.write(records)
+        except sqlalchemy.exc.SQLAlchemyError as e:
+            self.failures += 1
+            wait = min(2.0 ** self.failures, self.backoff)
+            self.retry = time.monotonic() + wait
+            logger.warning(f'Could not write {len(records)} record(s) to the database ({e.__class__.__name__}), next attempt in {wait:.0f}s.')
+            return False
+        self.failures = 0
+        self.retry = 0.0
+        self.records = {}
+        logger.debug(f'Just wrote {len(records)} record(s) to the database.')
+        if self.notify is not None:
+            timestamps = [r['timestamp'] for r in records]
+            # written all the same: the `pick` cache clears itself when its subscription drops
+            try:
+                self.notify(min(timestamps), max(timestamps))
+            except redis.exceptions.RedisError as e:
+                logger.warning(f'Could not announce the {len(records)} record(s) written ({e.__class__.__name__}).')
+        return True
+
+    def close(self):
+        if not self.flush():
+            logger.error(f'Could not write {len(self.records)} record(s) to the database before stopping.')
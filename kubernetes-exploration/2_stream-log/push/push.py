@@ -53,6 +53,11 @@ broker = redis.Redis(
     port=int(os.environ['REDIS_PORT'])
 )
 
-broker.publish('lipsum', random.choice(messages))
+# `pubsub` (fire and forget) or `streams` (kept until acknowledged; see pull.py)
+if os.environ.get('TRANSPORT', 'pubsub').lower() == 'streams':
+    # only the latest entries are kept, about `MAXLEN` of them
+    broker.xadd('lipsum', {'message': random.choice(messages)}, maxlen=int(os.environ.get('MAXLEN', 100000)), approximate=True)
+else:
+    broker.publish('lipsum', random.choice(messages))
 
 logger.info('Just pushed a message to the `lipsum` channel.')
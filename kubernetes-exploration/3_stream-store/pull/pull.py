@@ -2,35 +2,152 @@ import hashlib
 import logging
 import os
 import redis
+import signal
+import socket
+import sys
 import time
 
-if os.environ['HOARD'].lower() in ['1', 'on', 'true', 'yes']:
+hoard = os.environ['HOARD'].lower() in ['1', 'on', 'true', 'yes']
+
+if hoard:
     import pile
 
 logging.basicConfig(datefmt='%Y/%m/%d %X', format='%(asctime)s: %(message)s', level=os.environ.get('LOG_LEVEL', 'INFO'))
 logger = logging.getLogger(__name__)
 
+# stop gracefully (see the `finally` clause below) when the container is stopped
+signal.signal(signal.SIGTERM, lambda *args: sys.exit(0))
+
 broker = redis.Redis(
     password=os.environ.get('REDIS_PASSWORD', ''),
     host=os.environ['REDIS_HOST'],
     port=int(os.environ['REDIS_PORT'])
 )
 
-pubsub = broker.pubsub()
-pubsub.subscribe('lipsum')
+if hoard:
+    # tell the `pick` service which time span just got written (see its cache)
+    writer = pile.Writer(
+        int(os.environ.get('FLUSH_SIZE', 100)),
+        float(os.environ.get('FLUSH_DELAY', 1)),
+        notify=lambda since, until: broker.publish('pile', f'{since} {until}')
+    )
+
+# `pubsub` (fire and forget) or `streams` (kept until acknowledged, shared by the replicas)
+streams = os.environ.get('TRANSPORT', 'pubsub').lower() == 'streams'
 
-while True:
-    message = pubsub.get_message()
-    if message is not None:
+if streams:
+    group = os.environ.get('GROUP', 'pull')
+    consumer = os.environ.get('HOSTNAME', socket.gethostname())
+    idle = int(os.environ.get('CLAIM_IDLE', 60000))  # in ms, before reclaiming the entries of another consumer
+    try:
+        broker.xgroup_create('lipsum', group, id='0', mkstream=True)
+    except redis.exceptions.ResponseError as e:
+        if 'BUSYGROUP' not in str(e):
+            raise
+else:
+    pubsub = broker.pubsub(ignore_subscribe_messages=True)
+    pubsub.subscribe('lipsum')
+
+def drain(timeout, size):
+    # block until a message comes in (or the timeout expires), then grab whatever
+    # else is already pending without waiting any further, up to `size` messages
+    messages = []
+    message = pubsub.get_message(timeout=timeout)
+    while message is not None:
         if message['type'] == 'message':
-            content = message['data'].decode()
-            if os.environ['HOARD'].lower() in ['1', 'on', 'true', 'yes']:
-                pile.create_tables_if_not_existing()
-                seconds = int(round(time.time(), 0))
-                pile.insert(pile.Data(
-                    id_=hashlib.sha256(f'{seconds}-{content}'.encode()).hexdigest(),
+            messages.append((None, message['data'].decode()))
+        if len(messages) >= size:
+            break
+        message = pubsub.get_message(timeout=0.0)
+    return messages
+
+# last entry replayed from the pending ones of this consumer (None once done), and where
+# (when) to resume reclaiming the entries idle for too long on the other ones
+replayed = '0'
+claim = {'start': '0-0', 'since': 0.0}
+
+def take(timeout, size):
+    # entries delivered but never acknowledged first (this consumer restarted, or another
+    # one died), then new ones, blocking up to `timeout` seconds; up to `size` at a time
+    global replayed
+    if replayed is not None:
+        entries = broker.xreadgroup(group, consumer, {'lipsum': replayed}, count=size)[0][1]
+        if entries:
+            replayed = entries[-1][0]
+        else:
+            replayed = None
+    elif time.monotonic() - claim['since'] >= idle / 1000:
+        reply = broker.xautoclaim('lipsum', group, consumer, idle, claim['start'], count=size)
+        claim['start'], entries = reply[0], reply[1]
+        # trimmed off the stream before being processed: listed apart by Redis 7, left
+        # among the entries (without fields, see below) by Redis 6.2
+        if len(reply) > 2 and reply[2]:
+            broker.xack('lipsum', group, *reply[2])
+        if claim['start'] in [b'0-0', '0-0']:
+            claim['since'] = time.monotonic()
+    else:
+        entries = []
+    if not entries:
+        response = broker.xreadgroup(group, consumer, {'lipsum': '>'}, count=size, block=max(int(timeout * 1000), 1))
+        entries = response[0][1] if response else []
+    # trimmed off the stream before being processed: nothing to do but acknowledge
+    missing = [i for i, fields in entries if not fields]
+    if missing:
+        broker.xack('lipsum', group, *missing)
+    return [(i.decode(), fields[b'message'].decode()) for i, fields in entries if fields]
+
+# entries processed, to be acknowledged once their records are written
+unacked = []
+
+def acknowledge():
+    global unacked
+    if streams and unacked:
+        broker.xack('lipsum', group, *unacked)
+    unacked = []
+
+timeout = float(os.environ.get('INTERVAL', 10))
+if hoard:
+    # wake up in time to write the buffered records
+    timeout = min(timeout, writer.delay)
+
+try:
+    while True:
+        if streams:
+            messages = take(timeout, int(os.environ.get('BATCH', 100)))
+        else:
+            messages = drain(timeout, int(os.environ.get('BATCH', 100)))
+        for entry, content in messages:
+            if hoard:
+                if entry is None:
+                    seconds = int(round(time.time(), 0))
+                    key = f'{seconds}-{content}'
+                else:
+                    # the same record whichever replica (re)processes the entry
+                    seconds = int(round(int(entry.split('-')[0]) / 1000, 0))
+                    key = f'{entry}-{content}'
+                writer.add(pile.Data(
+                    id_=hashlib.sha256(key.encode()).hexdigest(),
                     timestamp=seconds,
                     message=content
                 ))
+                unacked.append(entry)
+                # everything added so far is written
+                if not writer.records:
+                    acknowledge()
+            else:
+                unacked.append(entry)
             logger.debug(content)
-    time.sleep(int(os.environ.get('INTERVAL', 10)))
+        if messages:
+            logger.debug(f'Just pulled {len(messages)} message(s) from the `lipsum` channel.')
+        if hoard:
+            writer.tick()
+            if not writer.records:
+                acknowledge()
+        else:
+            acknowledge()
+finally:
+    if hoard:
+        writer.close()
+    # the entries of the records left unwritten are delivered again (see `take()`)
+    if not hoard or not writer.records:
+        acknowledge()
@@ -1,20 +1,191 @@
+import bisect
+import collections
 import falcon
 import falcon_cors
+import functools
 import json
+import logging
+import orjson
 import os
+import redis
+import threading
 import time
 
 if os.environ['HOARD'].lower() in ['1', 'on', 'true', 'yes']:
     import pile
 
+logger = logging.getLogger(__name__)
+
 strftime = lambda s: time.strftime('%Y/%m/%d %H:%M:%S', time.localtime(s))
 
+# many records share the same second
+cached_strftime = functools.lru_cache(maxsize=4096)(strftime)
+
+def encode(id_, timestamp, message):
+    return orjson.dumps({
+        'id': id_,
+        'timestamp': f'{timestamp}: {cached_strftime(timestamp)}',
+        'message': message
+    })
+
+def encoded(partitions):
+    for rows in partitions:
+        yield [encode(*row) for row in rows]
+
+def paged(since, until, size=10000):
+    # keyset pages (resuming after the last identifier seen), rather than a single query
+    # held open over the whole history
+    after_id = None
+    while True:
+        count = 0
+        for rows in pile.rows(since, until, after_id, size):
+            if rows:
+                count += len(rows)
+                after_id = rows[-1][0]
+                yield rows
+        if count < size:
+            return
+
+def stream(pieces):
+    # a single JSON array, sent a piece (list of encoded messages) at a time
+    yield b'['
+    separator = b''
+    for items in pieces:
+        if items:
+            yield separator + b','.join(items)
+            separator = b','
+    yield b']'
+
+class Buckets:
+    # the messages of the closed time buckets (`width` seconds each, aligned on the epoch),
+    # encoded and kept in memory, the least recently used ones dropped past `size` buckets;
+    # only the open bucket (the current one) is queried again and again, the others once,
+    # unless the `pull` service announces (on the `pile` channel) a write overlapping them
+
+    # only the last `size` closed buckets are cached (a scan of the whole history would
+    # otherwise evict the very buckets it just cached), older messages are read as is
+
+    def __init__(self, width=60, size=1024):
+        self.width = width
+        self.size = size
+        self.buckets = collections.OrderedDict()
+        self.first = None  # earliest timestamp stored
+        self.version = 0  # bumped on each invalidation
+        self.listening = False
+        self.lock = threading.Lock()
+
+    def listen(self, broker):
+        # no caching unless subscribed, as announcements could be missed otherwise
+        while True:
+            pubsub = broker.pubsub()
+            try:
+                pubsub.subscribe('pile')
+                for message in pubsub.listen():
+                    if message['type'] == 'subscribe':
+                        self.listening = True
+                    elif message['type'] == 'message':
+                        try:
+                            since, until = map(int, message['data'].split())
+                        except (TypeError, ValueError):
+                            # whatever got written, nothing cached can be trusted anymore
+                            logger.warning(f'Unexpected announcement on the `pile` channel: {message["data"]!r}.')
+                            self.invalidate()
+                            continue
+                        self.invalidate(since, until)
+            except redis.exceptions.RedisError:
+                pass
+            finally:
+                self.listening = False
+                self.invalidate()
+                pubsub.close()
+            time.sleep(1)
+
+    def invalidate(self, since=None, until=None):
+        with self.lock:
+            self.version += 1
+            if since is None:
+                self.buckets.clear()
+                self.first = None
+                return
+            if self.first is not None:
+                self.first = min(self.first, since)
+            for start in range(since - since % self.width, until + 1, self.width):
+                self.buckets.pop(start, None)
+
+    def get(self, start):
+        with self.lock:
+            if start in self.buckets:
+                self.buckets.move_to_end(start)
+                return self.buckets[start]
+
+    def put(self, start, bucket, version):
+        # unless invalidated in the meantime (the bucket could be stale already)
+        with self.lock:
+            if self.version == version:
+                self.buckets[start] = bucket
+                self.buckets.move_to_end(start)
+                while len(self.buckets) > self.size:
+                    self.buckets.popitem(last=False)
+
+    def fetch(self, start, stop, version):
+        # query the buckets from `start` to `stop` at once, yield (and cache) them one by one
+        bucket = start, [], []
+        for rows in pile.rows(start, stop - 1):
+            for row in rows:
+                while row[1] >= bucket[0] + self.width:
+                    self.put(bucket[0], bucket[1:], version)
+                    yield bucket[1:]
+                    bucket = bucket[0] + self.width, [], []
+                bucket[1].append(row[1])
+                bucket[2].append(encode(*row))
+        while bucket[0] < stop:
+            self.put(bucket[0], bucket[1:], version)
+            yield bucket[1:]
+            bucket = bucket[0] + self.width, [], []
+
+    def pieces(self, since, until):
+        with self.lock:
+            version = self.version
+            first = self.first
+        if first is None:
+            first = pile.first()
+            if first is None:
+                yield from encoded(pile.rows(since, until))
+                return
+            with self.lock:
+                if self.version == version:
+                    self.first = first
+        since = max(since, first)
+        now = int(time.time())
+        closed = min(until + 1, now - now % self.width)
+        horizon = now - now % self.width - self.size * self.width
+        if since < horizon:
+            yield from encoded(paged(since, min(until, horizon - 1)))
+            since = horizon
+        start = since - since % self.width
+        while start < closed:
+            bucket = self.get(start)
+            if bucket is not None:
+                stop = start + self.width
+                buckets = [bucket]
+            else:
+                # along with the next missing ones
+                stop = start + self.width
+                while stop < closed and self.get(stop) is None:
+                    stop += self.width
+                buckets = self.fetch(start, stop, version)
+            for timestamps, items in buckets:
+                yield items[bisect.bisect_left(timestamps, since):bisect.bisect_right(timestamps, until)]
+            start = stop
+        if until >= closed:
+            yield from encoded(pile.rows(max(since, closed), until))
+
 class Docs:
 
     def on_get(self, req, resp):
         resp.text = json.dumps({
             '/docs': 'Returns this. Available on the root endpoint also.',
-            '/list?since=<int>&until=<int>': 'Returns the messages stored in the relational database, time-bounded through the [optional] parameters (in seconds since epoch).',
+            '/list?since=<int>&until=<int>&after_id=<str>&limit=<int>': 'Returns the messages stored in the relational database, time-bounded through the [optional] parameters (in seconds since epoch), and ordered by timestamp then identifier. At most `limit` messages are returned if provided, the next ones being those after the identifier (`after_id`) of the last one (400 if unknown).',
             '/time?shift=<int>': 'Returns the current time, formatted as a date or in seconds since epoch. If a shift (in second) is provided the date will be shifted by that much.'
         }, indent=4)
 
@@ -27,17 +198,25 @@ class List:
         until = int(round(time.time(), 0))
         if 'until' in req.params:
             until = int(round(int(req.params['until']), 0))
+        after_id = req.params.get('after_id')
+        limit = None
+        if 'limit' in req.params:
+            limit = int(req.params['limit'])
         if os.environ['HOARD'].lower() in ['1', 'on', 'true', 'yes']:
-            pile.create_tables_if_not_existing()
-            records = pile.query(pile.Data, since, until)
-            results = [{
-                'id': r.id_,
-                'timestamp': f'{r.timestamp}: {strftime(r.timestamp)}',
-                'message': r.message
-            } for r in records ]
+            resp.content_type = falcon.MEDIA_JSON
+            if after_id is None and limit is None and buckets.listening:
+                resp.stream = stream(buckets.pieces(since, until))
+            else:
+                try:
+                    partitions = pile.rows(since, until, after_id, limit)
+                except KeyError:
+                    raise falcon.HTTPBadRequest(
+                        title='Unknown identifier',
+                        description=f'No message to resume after, `after_id` ({after_id}) is unknown.'
+                    )
+                resp.stream = stream(encoded(partitions))
         else:
-            results = 'No database or no access to this latter.'
-        resp.text = json.dumps(results, indent=4)
+            resp.text = json.dumps('No database or no access to this latter.', indent=4)
 
 class Time:
 
@@ -52,6 +231,15 @@ class Time:
             'shift': shift
         }, indent=4)
 
+if os.environ['HOARD'].lower() in ['1', 'on', 'true', 'yes']:
+    buckets = Buckets(int(os.environ.get('CACHE_BUCKET', 60)), int(os.environ.get('CACHE_SIZE', 1024)))
+    broker = redis.Redis(
+        password=os.environ.get('REDIS_PASSWORD', ''),
+        host=os.environ['REDIS_HOST'],
+        port=int(os.environ['REDIS_PORT'])
+    )
+    threading.Thread(target=buckets.listen, args=(broker,), daemon=True).start()
+
 cors = falcon_cors.CORS(
     allow_all_headers=True,
     allow_all_methods=True,
@@ -0,0 +1,88 @@
+import os
+import redis
+import sys
+import threading
+import time
+
+# compare the throughput of the two transports of the `lipsum` pipeline (see the
+# `TRANSPORT` environment variable of the `push` and `pull` services), against the
+# `Redis` broker pointed at by `REDIS_HOST` and `REDIS_PORT`:
+#
+#   $ REDIS_HOST=localhost REDIS_PORT=6379 python bench.py [<messages> [<batch>]]
+#
+# the messages are pushed in pipelines of `batch` commands, and pulled the same way
+# the `pull` service does (up to `batch` messages at a time); timed from the first push
+# to the last message pulled (and acknowledged)
+
+count = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+batch = int(sys.argv[2]) if len(sys.argv) > 2 else 100
+
+def connect():
+    return redis.Redis(
+        password=os.environ.get('REDIS_PASSWORD', ''),
+        host=os.environ['REDIS_HOST'],
+        port=int(os.environ['REDIS_PORT'])
+    )
+
+def push(send):
+    broker = connect()
+    for i in range(0, count, batch):
+        pipeline = broker.pipeline(transaction=False)
+        for j in range(i, min(i + batch, count)):
+            send(pipeline, f'message #{j}')
+        pipeline.execute()
+
+def bench_pubsub():
+    pubsub = connect().pubsub(ignore_subscribe_messages=True)
+    pubsub.subscribe('lipsum-bench')
+    pubsub.get_message(timeout=1.0)  # the subscription itself
+    received = 0
+    def pull():
+        nonlocal received
+        # nothing for a while: whatever is missing is lost
+        message = pubsub.get_message(timeout=1.0)
+        while message is not None and received < count:
+            received += 1
+            message = pubsub.get_message(timeout=1.0 if received < count else 0.0)
+    thread = threading.Thread(target=pull)
+    thread.start()
+    start = time.perf_counter()
+    push(lambda pipeline, message: pipeline.publish('lipsum-bench', message))
+    thread.join()
+    # the last second (waiting for more) does not count if some were lost
+    seconds = time.perf_counter() - start - (1.0 if received < count else 0.0)
+    pubsub.close()
+    return received, seconds
+
+def bench_streams():
+    broker = connect()
+    broker.delete('lipsum-bench')
+    broker.xgroup_create('lipsum-bench', 'bench', id='0', mkstream=True)
+    received = 0
+    pushed = threading.Event()
+    def pull():
+        nonlocal received
+        while received < count:
+            response = broker.xreadgroup('bench', 'bench', {'lipsum-bench': '>'}, count=batch, block=1000)
+            # nothing is lost, unless all got pushed but nothing else comes
+            if not response:
+                if pushed.is_set():
+                    break
+                continue
+            entries = response[0][1]
+            broker.xack('lipsum-bench', 'bench', *[i for i, _ in entries])
+            received += len(entries)
+    thread = threading.Thread(target=pull)
+    thread.start()
+    start = time.perf_counter()
+    push(lambda pipeline, message: pipeline.xadd('lipsum-bench', {'message': message}))
+    pushed.set()
+    thread.join()
+    seconds = time.perf_counter() - start
+    broker.delete('lipsum-bench')
+    return received, seconds
+
+print(f'{count} messages, batches of {batch}')
+for name, bench in [('pubsub', bench_pubsub), ('streams', bench_streams)]:
+    received, seconds = bench()
+    print(f'{name:>8}: {received} pulled ({count - received} lost) in {seconds:.2f}s, {received / seconds:.0f} messages/s')
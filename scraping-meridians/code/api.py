@@ -0,0 +1,234 @@
+"""Serve the (averaged) land or sea status of any pair of coordinates.
+
+The dataset built by `svg.py` (`dataset-{size}.npy`) is memory-mapped at startup (or
+materialized from its run-length encoded meridians, `dataset-{size}.npz`, if only
+those were kept; see `sparse`), and averaged once to a few coarser grids (all from the
+same summed-area table, see `svg.average_grid()`). Each query is then a mere index
+computation and array lookup, vectorized over batches of coordinates.
+
+Run with (from the folder containing the dataset):
+
+```bash
+$ .venv/bin/python code/api.py 1 8000
+```
+
+for the dataset of resolution `1`, served on port `8000`. Available endpoints:
+
+* `GET /grids`: list the available grid sizes,
+* `GET /point?lat=<lat>&lng=<lng>[&grid=<nlat>x<nlng>]`: status of a single location,
+  as `JSON`,
+* `POST /batch[?grid=<nlat>x<nlng>]`: status of many locations at once. The body is
+  either a `JSON` list of `[lat, lng]` pairs (`Content-Type: application/json`,
+  answered in `JSON`), or a raw array of little-endian `float64` pairs
+  (`Content-Type: application/octet-stream`, answered with one byte per location).
+
+Locations are given in degrees, latitudes in `[-90, 90]` and longitudes in
+`[-180, 180]`; the status is `1` for land, `0` for sea. The finest grid is used unless
+another one is requested.
+
+Attributes
+----------
+shapes : typing.List[typing.Tuple[int, int]]
+    Coarser grid sizes precomputed at startup.
+"""
+
+import http.server
+import json
+import sys
+import typing
+import urllib.parse
+
+import numpy as np
+
+import sparse
+import svg
+
+shapes: typing.List[typing.Tuple[int, int]] = [(90, 180), (45, 90), (18, 36)]
+
+
+def load_grids(
+    size: int, shapes: typing.List[typing.Tuple[int, int]] = shapes
+) -> typing.Dict[typing.Tuple[int, int], np.array]:
+    """Memory-map the dataset, and average it to coarser grids.
+
+    Parameters
+    ----------
+    size : int
+        Resolution of the dataset (`dataset-{size}.npy`, or `dataset-{size}.npz`).
+    shapes : typing.List[typing.Tuple[int, int]]
+        Coarser grid sizes to average to. Defaults to the `shapes` module attribute.
+
+    Returns
+    -------
+    : typing.Dict[typing.Tuple[int, int], numpy.array]
+        Grids indexed by shape, the finest (the dataset itself) first.
+    """
+    svg.size = size
+
+    try:
+        arr = np.load(f"dataset-{size}.npy", mmap_mode="r")
+    except FileNotFoundError:
+        arr = sparse.materialize(sparse.load(f"dataset-{size}.npz"))
+    integral = svg.integral_image(arr)
+
+    grids = {arr.shape: arr}
+    for shape in shapes:
+        if shape not in grids:
+            grids[shape] = svg.average_grid(arr, shape, integral)
+
+    return grids
+
+
+def locate(
+    lat: np.array, lng: np.array, shape: typing.Tuple[int, int]
+) -> typing.Tuple[np.array, np.array]:
+    """Convert coordinates to grid indices (vectorized `svg._nth()`).
+
+    Parameters
+    ----------
+    lat : numpy.array
+        Latitudes, in degrees.
+    lng : numpy.array
+        Longitudes, in degrees.
+    shape : typing.Tuple[int, int]
+        Size of the grid.
+
+    Returns
+    -------
+    : numpy.array
+        Row of each location; the South pole is folded onto the last row.
+    : numpy.array
+        Column of each location; longitudes wrap around.
+    """
+    rows = np.round((90.0 - lat) * (shape[0] / 180)).astype(np.intp)
+    cols = np.round((lng + 180.0) * (shape[1] / 360)).astype(np.intp)
+
+    return np.minimum(rows, shape[0] - 1), cols % shape[1]
+
+
+def lookup(grid: np.array, lat: np.array, lng: np.array) -> np.array:
+    """Look the status of locations up.
+
+    Parameters
+    ----------
+    grid : numpy.array
+        Grid to look the locations up in.
+    lat : numpy.array
+        Latitudes, in degrees.
+    lng : numpy.array
+        Longitudes, in degrees.
+
+    Returns
+    -------
+    : numpy.array
+        Land (`1`) or sea (`0`) status of each location.
+
+    Raises
+    ------
+    : ValueError
+        If any coordinate is out of range.
+    """
+    lat = np.asarray(lat, dtype=np.float64)
+    lng = np.asarray(lng, dtype=np.float64)
+
+    if not (np.all(np.abs(lat) <= 90.0) and np.all(np.abs(lng) <= 180.0)):
+        raise ValueError("Coordinates out of range.")
+
+    return grid[locate(lat, lng, grid.shape)]
+
+
+def serve(grids: typing.Dict[typing.Tuple[int, int], np.array], port: int = 8000):
+    """Serve the lookups over `HTTP`.
+
+    Parameters
+    ----------
+    grids : typing.Dict[typing.Tuple[int, int], numpy.array]
+        Grids indexed by shape, the finest first (see `load_grids()`).
+    port : int
+        Port to listen to. Defaults to `8000`.
+    """
+    finest = next(iter(grids))
+
+    class Handler(http.server.BaseHTTPRequestHandler):
+        # keep the connections alive between queries, and answer without delay
+        protocol_version = "HTTP/1.1"
+        disable_nagle_algorithm = True
+
+        def _query(self) -> typing.Tuple[str, typing.Dict[str, str], np.array]:
+            url = urllib.parse.urlsplit(self.path)
+            query = dict(urllib.parse.parse_qsl(url.query))
+
+            try:
+                shape = tuple(map(int, query["grid"].split("x")))
+            except KeyError:
+                shape = finest
+
+            return url.path, query, grids[shape]
+
+        def _send(self, content: bytes, kind: str = "application/json"):
+            self.send_response(200)
+            self.send_header("Content-Type", kind)
+            self.send_header("Content-Length", str(len(content)))
+            self.end_headers()
+            self.wfile.write(content)
+
+        def do_GET(self):
+            try:
+                path, query, grid = self._query()
+
+                if path == "/grids":
+                    content = [list(shape) for shape in grids]
+                elif path == "/point":
+                    lat, lng = float(query["lat"]), float(query["lng"])
+                    content = {
+                        "lat": lat,
+                        "lng": lng,
+                        "grid": list(grid.shape),
+                        "land": int(lookup(grid, lat, lng)),
+                    }
+                else:
+                    self.send_error(404)
+                    return
+
+            except (KeyError, ValueError):
+                self.send_error(400)
+                return
+
+            self._send(json.dumps(content).encode())
+
+        def do_POST(self):
+            try:
+                # a missing length would read until the client closes the connection
+                length = int(self.headers["Content-Length"])
+                if length < 0:
+                    raise ValueError(f"Invalid Content-Length: {length}.")
+                body = self.rfile.read(length)
+
+                path, _, grid = self._query()
+
+                if path != "/batch":
+                    self.send_error(404)
+                    return
+
+                if self.headers.get("Content-Type") == "application/octet-stream":
+                    points = np.frombuffer(body, dtype="<f8").reshape(-1, 2)
+                    land = lookup(grid, points[:, 0], points[:, 1])
+                    self._send(
+                        land.astype(np.uint8).tobytes(), "application/octet-stream"
+                    )
+                else:
+                    points = np.array(json.loads(body), dtype=np.float64).reshape(-1, 2)
+                    land = lookup(grid, points[:, 0], points[:, 1])
+                    self._send(json.dumps({"land": land.tolist()}).encode())
+
+            except (KeyError, TypeError, ValueError):
+                self.send_error(400)
+
+        def log_message(self, *args):
+            pass
+
+    http.server.ThreadingHTTPServer(("", port), Handler).serve_forever()
+
+
+if __name__ == "__main__":
+    serve(load_grids(int(sys.argv[1])), int(sys.argv[2]) if len(sys.argv) > 2 else 8000)
@@ -0,0 +1,485 @@
+"""Quick benchmarks of the different steps of the dataset building.
+
+Run with (from the folder containing the `pages.sqlite` store of the fetched pages, for
+the extraction benchmark):
+
+```bash
+$ .venv/bin/python code/bench.py
+```
+"""
+
+import sys
+import time
+import typing
+
+import numpy as np
+
+import api
+import extract
+import png
+import projection
+import sparse
+import svg
+
+
+def _timeit(func: typing.Callable, *args, repeat: int = 3, **kwargs) -> float:
+    """Time the best of a few runs of a function.
+
+    Parameters
+    ----------
+    func : typing.Callable
+        Function to time.
+    repeat : int
+        Number of runs. Defaults to `3`.
+
+    Returns
+    -------
+    : float
+        Shortest run time, in seconds.
+    """
+    best = float("inf")
+
+    for _ in range(repeat):
+        t = time.perf_counter()
+        func(*args, **kwargs)
+        best = min(best, time.perf_counter() - t)
+
+    return best
+
+
+def approximate_unknown_loop(arr: np.array, size: int) -> np.array:
+    """Reference (original) loop implementation of `svg.approximate_unknown()`.
+
+    Parameters
+    ----------
+    arr : numpy.array
+        The array to fill up with data.
+    size : int
+        Resolution of the array.
+
+    Returns
+    -------
+    : numpy.array
+        Filled array.
+    """
+    if len(np.where(arr == 0)[0]):
+
+        # only water up there
+        arr[0, :] = 2
+
+        # first pass: approximate unknown latitudes
+        # applied only on the known longitudes
+        for lng in range(0, 360 * size, size):
+            for lat in range(1, 180 * size):
+                if not arr[lat, lng]:
+                    arr[lat, lng] = arr[lat - 1, lng]
+
+    if len(np.where(arr == 0)[0]):
+
+        # second pass: approximate unknown longitudes
+        for lat in range(1, 180 * size):
+            for lng in range(0, 360 * size, size):
+                curr_value = arr[lat, lng]
+
+                try:
+                    next_value = arr[lat, lng + size]
+                except IndexError:
+                    next_value = arr[lat, 0]
+
+                if curr_value == next_value:
+                    arr[lat, lng : lng + size] = curr_value
+                else:
+                    arr[lat, lng : lng + size // 2] = curr_value
+                    arr[lat, lng + size // 2 : lng + size] = next_value
+
+    arr[np.where(arr == 2)] = 0  # sea is absence of land
+
+    return arr
+
+
+def _observed(size: int, seed: int = 42) -> np.array:
+    """Generate a random grid, observed on the meridians only (as scraped).
+
+    Parameters
+    ----------
+    size : int
+        Resolution of the grid.
+    seed : int
+        Seed of the random generator. Defaults to `42`.
+
+    Returns
+    -------
+    : numpy.array
+        Grid of unknown (`0`), land (`1`) and sea (`2`) values.
+    """
+    rng = np.random.default_rng(seed)
+
+    arr: np.array = np.zeros((180 * size, 360 * size), dtype=np.int8)
+    arr[:, ::size] = rng.choice([0, 1, 2], p=[0.9, 0.04, 0.06], size=(180 * size, 360))
+
+    return arr
+
+
+def bench_approximate(sizes: typing.List[int] = [1, 4, 16]):
+    """Compare the loop and vectorized gap filling, and check their outputs are equal.
+
+    Parameters
+    ----------
+    sizes : typing.List[int]
+        Resolutions to benchmark against. Defaults to `[1, 4, 16]`.
+    """
+    sys.stdout.write("approximate_unknown\n")
+
+    for size in sizes:
+        svg.size = size
+
+        arr = _observed(size)
+
+        loop = _timeit(lambda: approximate_unknown_loop(arr.copy(), size), repeat=1)
+        vect = _timeit(lambda: svg.approximate_unknown(arr.copy()))
+        identical = np.array_equal(
+            approximate_unknown_loop(arr.copy(), size),
+            svg.approximate_unknown(arr.copy()),
+        )
+
+        sys.stdout.write(
+            f"  size {size:2d} ({180*size}x{360*size}): loop {loop:8.4f}s, "
+            f"vectorized {vect:8.4f}s ({loop/vect:6.0f}x), identical: {identical}\n"
+        )
+
+    svg.size = 1
+
+
+def average_grid_loop(
+    arr: np.array, grid: typing.Tuple[int, int], size: int
+) -> np.array:
+    """Reference (original) loop implementation of `svg.average_grid()`.
+
+    Parameters
+    ----------
+    arr : numpy.array
+        The array to average.
+    grid : typing.Tuple[int, int]
+        Size of the grid to average to.
+    size : int
+        Resolution of the array.
+
+    Returns
+    -------
+    : numpy.array
+        Averaged array.
+    """
+    avg: np.array = np.zeros(grid, dtype=np.int8)
+
+    fx = 180 * size // grid[0]
+    fy = 360 * size // grid[1]
+
+    hfx = fx // 2
+    hfy = fy // 2
+
+    nlat, nlng = arr.shape
+
+    # periodic boundary conditions
+    arr_pbc = np.hstack((arr[:, nlng - hfy : nlng], arr))
+    arr_pbc = np.hstack((arr_pbc, arr[:, 0:hfy]))
+
+    # averages
+    for lat in range(grid[0]):
+        for lng in range(grid[1]):
+            lat_min = 0 if lat * fx - hfx < 0 else lat * fx - hfx
+            lat_max = nlat if lat * fx + hfx >= nlat else lat * fx + hfx
+            lng_min = lng * fy
+            lng_max = lng * fy + 2 * hfy
+            avg[lat, lng] = int(
+                round(np.mean(arr_pbc[lat_min:lat_max, lng_min:lng_max]), 0)
+            )
+
+    return avg
+
+
+def bench_average(
+    sizes: typing.List[int] = [1, 4, 16],
+    grids: typing.List[typing.Tuple[int, int]] = [(45, 90), (90, 180), (18, 36)],
+):
+    """Compare the loop and summed-area table averaging, and check their outputs.
+
+    Parameters
+    ----------
+    sizes : typing.List[int]
+        Resolutions to benchmark against. Defaults to `[1, 4, 16]`.
+    grids : typing.List[typing.Tuple[int, int]]
+        Grid sizes to average to. Defaults to `[(45, 90), (90, 180), (18, 36)]`.
+    """
+    sys.stdout.write("average_grid\n")
+
+    for size in sizes:
+        svg.size = size
+        arr = svg.approximate_unknown(_observed(size))
+
+        t = time.perf_counter()
+        integral = svg.integral_image(arr)
+        t = time.perf_counter() - t
+
+        sys.stdout.write(f"  size {size:2d}: integral image {t:8.4f}s\n")
+
+        for grid in grids:
+            loop = _timeit(average_grid_loop, arr, grid, size, repeat=1)
+            sat = _timeit(svg.average_grid, arr, grid, integral)
+            identical = np.array_equal(
+                average_grid_loop(arr, grid, size),
+                svg.average_grid(arr, grid, integral),
+            )
+
+            sys.stdout.write(
+                f"    {str(grid):10s} loop {loop:8.4f}s, summed-area {sat:8.4f}s "
+                f"({loop/sat:6.0f}x), identical: {identical}\n"
+            )
+
+    svg.size = 1
+
+
+def bench_lookup(sizes: typing.List[int] = [1, 4, 16], count: int = 100000):
+    """Compare per-location and vectorized lookups, and check their outputs.
+
+    Parameters
+    ----------
+    sizes : typing.List[int]
+        Resolutions to benchmark against. Defaults to `[1, 4, 16]`.
+    count : int
+        Number of random locations to look up. Defaults to `100000`.
+    """
+    sys.stdout.write(f"lookup ({count} locations)\n")
+
+    rng = np.random.default_rng(42)
+
+    for size in sizes:
+        svg.size = size
+        arr = svg.approximate_unknown(_observed(size))
+
+        # away from the South pole, out of the grid with _nth()
+        lat = rng.uniform(-90.0 + 0.5 / size, 90.0, count)
+        lng = rng.uniform(-180.0, 180.0, count)
+
+        def loop() -> np.array:
+            land = np.zeros(count, dtype=np.int8)
+            for i in range(count):
+                lt, lg = svg._nth(np.abs(lat[i] - 90.0), lng[i] + 180.0)
+                land[i] = arr[lt, lg % arr.shape[1]]
+            return land
+
+        loop_t = _timeit(loop, repeat=1)
+        vect_t = _timeit(api.lookup, arr, lat, lng)
+        identical = np.array_equal(loop(), api.lookup(arr, lat, lng))
+
+        sys.stdout.write(
+            f"  size {size:2d}: loop {count/loop_t:12,.0f}/s, "
+            f"vectorized {count/vect_t:12,.0f}/s, identical: {identical}\n"
+        )
+
+    svg.size = 1
+
+
+def render_plot_loop(
+    arr: np.array,
+    radius: int,
+    margin: int,
+    colors: typing.Dict[int, str] = {0: "#0969da", 1: "#39d353"},
+    styles: typing.Dict[str, str] = {},
+) -> str:
+    """Reference (original) loop implementation of `svg.render_plot()`.
+
+    Parameters
+    ----------
+    arr : numpy.array
+        The array of data to process.
+    radius : int
+        Size of the points.
+    margin: int
+        Distance between points.
+    colors : typing.Dict[int, str]
+        Dictionary of colors for the two types of points. Defaults to
+        `{0: "#0969da", 1: "#39d353"}`.
+    styles : typing.Dict[str, str]
+        Extra style to apply to the SVG points. Defaults to an empty dictionary.
+
+    Returns
+    -------
+    : str
+        All SVG objects concatenated as a string.
+    """
+    shape = styles.pop("shape", "square").lower()
+    if shape in ["s", "square"]:
+        rxy = f"{radius*0.25:.2f}"
+    elif shape in ["c", "circle"]:
+        rxy = f"{radius*0.5:.2f}"
+    else:
+        raise NotImplementedError(f'Shape "{shape}" is unknown.')
+
+    points = ""
+    nlat, nlng = arr.shape
+    for lat in range(nlat):
+        for lng in range(nlng):
+            points += svg.svg_point.substitute(
+                x=lng * (radius + margin) + margin,
+                y=lat * (radius + margin) + margin,
+                rx=rxy,
+                ry=rxy,
+                width=radius,
+                color=colors[arr[lat, lng]],
+                style=" ".join([f'{k}="{v}"' for k, v in styles.items()]),
+            )
+
+    return points
+
+
+def bench_render(sizes: typing.List[int] = [1, 4]):
+    """Compare the per-point and run-length rendering, in time and output size.
+
+    Parameters
+    ----------
+    sizes : typing.List[int]
+        Resolutions to benchmark against. Defaults to `[1, 4]`.
+    """
+    sys.stdout.write("render_plot\n")
+
+    for size in sizes:
+        svg.size = size
+        arr = svg.approximate_unknown(_observed(size))
+
+        for label, grid in [("full", arr), ("averaged", svg.average_grid(arr))]:
+            loop = _timeit(render_plot_loop, grid, 8, 1, repeat=1)
+            runs = _timeit(svg.render_plot, grid, 8, 1)
+            raster = _timeit(
+                lambda: png.encode_png(png.render_canvas(grid, 8, 1)), repeat=1
+            )
+
+            sys.stdout.write(
+                f"  size {size:2d} {label:8s} {str(grid.shape):12s} "
+                f"loop {loop:8.4f}s ({len(render_plot_loop(grid, 8, 1))/1e6:6.2f}MB), "
+                f"runs {runs:8.4f}s ({len(svg.render_plot(grid, 8, 1))/1e6:6.2f}MB), "
+                f"png {raster:8.4f}s\n"
+            )
+
+    svg.size = 1
+
+
+def bench_sparse(store: str = "pages.sqlite", sizes: typing.List[int] = [1, 4, 16, 64]):
+    """Compare the dense and run-length encoded datasets, and check their contents.
+
+    Parameters
+    ----------
+    store : str
+        Filepath to the store of the fetched pages (and of their extracted rows).
+        Defaults to `pages.sqlite`.
+    sizes : typing.List[int]
+        Resolutions to benchmark against. Defaults to `[1, 4, 16, 64]`.
+    """
+    pages = svg.cache.PageCache(store)
+    extracted = {url: rows for url, (_, rows) in pages.get_rows(pages.urls()).items()}
+
+    sys.stdout.write(f"sparse ({len(extracted)} pages)\n")
+
+    for size in sizes:
+        svg.size = size
+        nlat, nlng = 180 * size, 360 * size
+
+        encode = _timeit(sparse.encode, extracted, size)
+        runs = sparse.encode(extracted, size)
+        nbytes = runs.starts.nbytes + runs.values.nbytes + runs.offsets.nbytes
+
+        t = time.perf_counter()
+        for _ in sparse.blocks(runs, packed=True):
+            pass
+        t = time.perf_counter() - t
+
+        # dense reference only where it fits comfortably in memory
+        identical = "-"
+        if size <= 16:
+            arr: np.array = np.zeros((nlat, nlng), dtype=np.int8)
+            svg.approximate_meridians(arr, svg.observe(extracted), np.arange(360))
+            identical = np.array_equal(sparse.materialize(runs), arr)
+
+        sys.stdout.write(
+            f"  size {size:2d}: dense {nlat*nlng/1e6:8.1f}MB, "
+            f"packed {nlat*nlng/8e6:7.1f}MB ({t:6.3f}s), "
+            f"runs {nbytes/1e3:6.1f}kB ({encode:6.4f}s), identical: {identical}\n"
+        )
+
+    svg.size = 1
+
+
+def bench_projection(sizes: typing.List[int] = [1, 4, 16], width: int = 1024):
+    """Time the computation of the inverse indices, and the reprojections.
+
+    Parameters
+    ----------
+    sizes : typing.List[int]
+        Resolutions to benchmark against. Defaults to `[1, 4, 16]`.
+    width : int
+        Width of the rasters, in pixels. Defaults to `1024`.
+    """
+    sys.stdout.write(f"projection ({width} pixels wide)\n")
+
+    for size in sizes:
+        svg.size = size
+        arr = svg.approximate_unknown(_observed(size))
+
+        for name in projection.projections:
+            raster = projection.raster_size(name, width)
+
+            projection.inverse_index.cache_clear()
+            first = _timeit(projection.reproject, arr, name, raster, repeat=1)
+            again = _timeit(projection.reproject, arr, name, raster)
+
+            sys.stdout.write(
+                f"  size {size:2d} {name:12s} {str(raster):12s} "
+                f"first {first:8.4f}s, cached {again:8.4f}s ({first/again:5.0f}x)\n"
+            )
+
+    svg.size = 1
+
+
+def bench_extract(store: str = "pages.sqlite"):
+    """Compare the throughput of the extraction backends over the stored pages.
+
+    The land/sea grid obtained with each backend is checked against the one obtained
+    with `BeautifulSoup` (the original backend).
+
+    Parameters
+    ----------
+    store : str
+        Filepath to the store of the fetched pages. Defaults to `pages.sqlite`.
+    """
+    pages = svg.cache.PageCache(store)
+    htmls = {url: page.content for url, page in pages.get_many(pages.urls()).items()}
+    nbytes = sum(len(html) for html in htmls.values())
+
+    sys.stdout.write(f"extract ({len(htmls)} pages, {nbytes/1e6:.1f}MB)\n")
+
+    def scrape(backend: str) -> np.array:
+        svg.backend = backend
+        arr: np.array = np.zeros((180 * svg.size, 360 * svg.size), dtype=np.int8)
+        for url, html in htmls.items():
+            arr = svg.scrape_one(url, arr, html)
+        return arr
+
+    reference = scrape("bs4")
+
+    for backend in extract.backends:
+        seconds = _timeit(scrape, backend, repeat=1)
+        identical = np.array_equal(scrape(backend), reference)
+
+        sys.stdout.write(
+            f"  {backend:12s} {seconds:7.3f}s {len(htmls)/seconds:8.1f} pages/s "
+            f"{nbytes/seconds/1e6:7.1f}MB/s, grid identical: {identical}\n"
+        )
+
+
+if __name__ == "__main__":
+    bench_approximate()
+    bench_average()
+    bench_lookup()
+    bench_render()
+    bench_projection()
+    bench_extract()
+    bench_sparse()
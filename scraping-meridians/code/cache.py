@@ -0,0 +1,296 @@
+"""Compressed store of the fetched pages, keyed by URL.
+
+All pages live in a single `SQLite` database (instead of one loose `.html` file per
+page), compressed via `zlib`, along with their `ETag` and `Last-Modified` headers to
+revalidate them with the website (conditional requests, answered with a lightweight
+`304 Not Modified` if the page did not change). Least recently used pages are evicted
+once the store grows over a given size, and pages can be looked up in bulk with a
+single query.
+
+The rows extracted from each page are kept too (in a separate table, not subject to the
+eviction), along with a digest of the content they were extracted from: pages left
+unchanged since their last parsing do not need to be parsed again.
+
+The store can be shared among threads.
+"""
+
+import sqlite3
+import threading
+import time
+import typing
+import zlib
+
+import numpy as np
+
+
+class Page(typing.NamedTuple):
+    """Cached page.
+
+    Attributes
+    ----------
+    url : str
+        The URL of the page.
+    content : str
+        HTML content of the page.
+    etag : str
+        `ETag` header sent along the page, if any.
+    modified : str
+        `Last-Modified` header sent along the page, if any.
+    fetched : float
+        Timestamp of the last download or revalidation of the page.
+    """
+
+    url: str
+    content: str
+    etag: typing.Optional[str]
+    modified: typing.Optional[str]
+    fetched: float
+
+
+class PageCache:
+    """Compressed, size-bounded store of the fetched pages.
+
+    Attributes
+    ----------
+    path : str
+        Filepath to the `SQLite` database.
+    max_bytes : int
+        Maximum size of the (compressed) pages kept in store.
+    level : int
+        `zlib` compression level.
+    """
+
+    def __init__(
+        self, path: str = "pages.sqlite", max_bytes: int = 256 << 20, level: int = 6
+    ):
+        """Describe the store; the database is only opened when first used.
+
+        Parameters
+        ----------
+        path : str
+            Filepath to the `SQLite` database. Defaults to `pages.sqlite`.
+        max_bytes : int
+            Maximum size of the (compressed) pages kept in store. Defaults to 256MB.
+        level : int
+            `zlib` compression level. Defaults to `6`.
+        """
+        self.path = path
+        self.max_bytes = max_bytes
+        self.level = level
+
+        self._db: sqlite3.Connection = None
+        self._lock = threading.Lock()
+
+    def _connect(self) -> sqlite3.Connection:
+        """Open the database (once) and create the table if needed.
+
+        Returns
+        -------
+        : sqlite3.Connection
+            Connection to the database.
+        """
+        if self._db is None:
+            self._db = sqlite3.connect(self.path, check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS pages ("
+                "url TEXT PRIMARY KEY, "
+                "content BLOB NOT NULL, "
+                "etag TEXT, "
+                "modified TEXT, "
+                "size INTEGER NOT NULL, "
+                "fetched REAL NOT NULL, "
+                "accessed REAL NOT NULL"
+                ")"
+            )
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS extracted ("
+                "url TEXT PRIMARY KEY, "
+                "digest TEXT NOT NULL, "
+                "rows BLOB NOT NULL"
+                ")"
+            )
+            self._db.commit()
+
+        return self._db
+
+    def urls(self) -> typing.List[str]:
+        """List the URLs of all the pages in store.
+
+        Returns
+        -------
+        : typing.List[str]
+            The URLs of the pages.
+        """
+        with self._lock:
+            rows = self._connect().execute("SELECT url FROM pages").fetchall()
+
+        return [url for url, in rows]
+
+    def get_many(self, urls: typing.List[str]) -> typing.Dict[str, Page]:
+        """Look pages up, all at once.
+
+        Parameters
+        ----------
+        urls : typing.List[str]
+            The URLs of the pages to look up.
+
+        Returns
+        -------
+        : typing.Dict[str, Page]
+            Cached pages, indexed by URL; pages not in store are left out.
+        """
+        if not urls:
+            return {}
+
+        marks = ", ".join(["?"] * len(urls))
+
+        with self._lock:
+            db = self._connect()
+            rows = db.execute(
+                "SELECT url, content, etag, modified, fetched "
+                f"FROM pages WHERE url IN ({marks})",
+                urls,
+            ).fetchall()
+            db.execute(
+                f"UPDATE pages SET accessed = ? WHERE url IN ({marks})",
+                [time.time(), *urls],
+            )
+            db.commit()
+
+        return {
+            url: Page(url, zlib.decompress(content).decode(), etag, modified, fetched)
+            for url, content, etag, modified, fetched in rows
+        }
+
+    def get(self, url: str) -> typing.Optional[Page]:
+        """Look a single page up.
+
+        Parameters
+        ----------
+        url : str
+            The URL of the page to look up.
+
+        Returns
+        -------
+        : typing.Optional[Page]
+            Cached page, or `None` if not in store.
+        """
+        return self.get_many([url]).get(url)
+
+    def put(
+        self,
+        url: str,
+        content: str,
+        etag: typing.Optional[str] = None,
+        modified: typing.Optional[str] = None,
+    ):
+        """Store (or replace) a page, and evict the least recently used ones if needed.
+
+        Parameters
+        ----------
+        url : str
+            The URL of the page.
+        content : str
+            HTML content of the page.
+        etag : typing.Optional[str]
+            `ETag` header sent along the page. Defaults to `None`.
+        modified : typing.Optional[str]
+            `Last-Modified` header sent along the page. Defaults to `None`.
+        """
+        blob = zlib.compress(content.encode(), self.level)
+        now = time.time()
+
+        with self._lock:
+            db = self._connect()
+            db.execute(
+                "INSERT OR REPLACE INTO pages VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (url, blob, etag, modified, len(blob), now, now),
+            )
+
+            # drop the pages beyond the budget, least recently used first
+            db.execute(
+                "DELETE FROM pages WHERE url IN ("
+                "SELECT url FROM ("
+                "SELECT url, SUM(size) OVER (ORDER BY accessed DESC, url) AS total "
+                "FROM pages"
+                ") WHERE total > ?"
+                ")",
+                (self.max_bytes,),
+            )
+            db.commit()
+
+    def touch(self, url: str):
+        """Mark a page as revalidated (still up-to-date) now.
+
+        Parameters
+        ----------
+        url : str
+            The URL of the page.
+        """
+        now = time.time()
+
+        with self._lock:
+            db = self._connect()
+            db.execute(
+                "UPDATE pages SET fetched = ?, accessed = ? WHERE url = ?",
+                (now, now, url),
+            )
+            db.commit()
+
+    def get_rows(
+        self, urls: typing.List[str]
+    ) -> typing.Dict[str, typing.Tuple[str, np.array]]:
+        """Look the rows extracted from pages up, all at once.
+
+        Parameters
+        ----------
+        urls : typing.List[str]
+            The URLs of the pages to look up.
+
+        Returns
+        -------
+        : typing.Dict[str, typing.Tuple[str, numpy.array]]
+            Digest of the parsed content and extracted rows (`NumPy` array of shape
+            `(n, 3)`, see `extract`), indexed by URL; pages never parsed are left out.
+        """
+        if not urls:
+            return {}
+
+        marks = ", ".join(["?"] * len(urls))
+
+        with self._lock:
+            rows = (
+                self._connect()
+                .execute(
+                    f"SELECT url, digest, rows FROM extracted WHERE url IN ({marks})",
+                    urls,
+                )
+                .fetchall()
+            )
+
+        return {
+            url: (digest, np.frombuffer(blob, dtype="<f8").reshape(-1, 3))
+            for url, digest, blob in rows
+        }
+
+    def put_rows(self, url: str, digest: str, rows: np.array):
+        """Store (or replace) the rows extracted from a page.
+
+        Parameters
+        ----------
+        url : str
+            The URL of the page.
+        digest : str
+            Digest of the parsed content.
+        rows : numpy.array
+            Extracted rows, as a `NumPy` array of shape `(n, 3)`.
+        """
+        blob = np.ascontiguousarray(rows, dtype="<f8").tobytes()
+
+        with self._lock:
+            db = self._connect()
+            db.execute(
+                "INSERT OR REPLACE INTO extracted VALUES (?, ?, ?)", (url, digest, blob)
+            )
+            db.commit()
@@ -0,0 +1,39 @@
+"""Locate the extracted rows on the grid, for both `svg` and `sparse`.
+
+The dense dataset (see `svg.observe()`) and the encoded meridians (see
+`sparse.encode()`) are filled from the same rows, located the same way. Kept apart from
+`svg`, which imports `sparse` (see `svg.update_dataset()`), so that `sparse` does not
+import it back.
+"""
+
+import typing
+
+import numpy as np
+
+
+def indices(rows: np.array, size: int) -> typing.Tuple[np.array, np.array]:
+    """Convert extracted rows to grid indices (vectorized `svg._nth()`).
+
+    Parameters
+    ----------
+    rows : numpy.array
+        Extracted rows, as a `NumPy` array of shape `(n, 3)`.
+    size : int
+        Resolution of the grid.
+
+    Returns
+    -------
+    : numpy.array
+        Row of each location, `-1` if out of the grid.
+    : numpy.array
+        Column of each location, `-1` if out of the grid.
+    """
+    nlat, nlng = 180 * size, 360 * size
+
+    latth = np.round(np.abs(rows[:, 0] - 90.0) * size).astype(np.intp)
+    lngth = np.round((rows[:, 1] + 180.0) * size).astype(np.intp)
+
+    # out of the grid (index errors in svg.scrape_one()), negative indices wrap around
+    valid = (latth >= -nlat) & (latth < nlat) & (lngth >= -nlng) & (lngth < nlng)
+
+    return np.where(valid, latth % nlat, -1), np.where(valid, lngth % nlng, -1)
@@ -0,0 +1,163 @@
+"""Extraction of the coordinates (and land or sea status) listed on a meridian page.
+
+Only the first `table.wikitable` of each page matters: for each of its rows, the first
+cell holds the coordinates (in a `span.geo` element, as `lat; lng`), and has a `style`
+attribute (its background colour) if the location is at sea.
+
+Several backends are available, all returning the same rows:
+
+* `bs4`: `BeautifulSoup` with the pure-`Python` `html.parser` (the original one),
+* `lxml`: the `libxml2` parser, and `XPath` queries,
+* `lxml-stream`: same as above, but the page is fed to the parser piece by piece and
+  parsing stops as soon as the first `table.wikitable` is complete.
+
+Both `lxml` (the default backends) and `beautifulsoup4` (the fallback) are listed in
+`requirements.txt`.
+
+Attributes
+----------
+backends : typing.Dict[str, typing.Callable[[str], typing.List[typing.Tuple]]]
+    Extraction functions, indexed by name.
+"""
+
+import typing
+
+import lxml.etree
+import lxml.html
+
+from bs4 import BeautifulSoup
+
+# xpath equivalents of the css class selectors
+_wikitable = "contains(concat(' ', normalize-space(@class), ' '), ' wikitable ')"
+_geo = ".//span[contains(concat(' ', normalize-space(@class), ' '), ' geo ')]"
+
+
+def extract_bs4(html: str) -> typing.List[typing.Tuple[float, float, int]]:
+    """Extract the rows of the first `table.wikitable` via `BeautifulSoup`.
+
+    Parameters
+    ----------
+    html : str
+        HTML content of the page.
+
+    Returns
+    -------
+    : typing.List[typing.Tuple[float, float, int]]
+        Latitude, longitude, and land (`1`) or sea (`2`) status of each row.
+    """
+    soup = BeautifulSoup(html, "html.parser")
+
+    rows = []
+    for row in soup.select("table.wikitable")[0].select("tr"):
+        try:
+            cell = row.select("td")[0]
+            lat, lng = map(float, cell.select("span.geo")[0].text.split(";"))
+            rows.append((lat, lng, 2 if "style" in cell.attrs else 1))
+        except IndexError:
+            pass
+
+    return rows
+
+
+def _rows(table: lxml.etree._Element) -> typing.List[typing.Tuple[float, float, int]]:
+    """Extract the rows of a (parsed) table via `XPath` queries.
+
+    Parameters
+    ----------
+    table : lxml.etree._Element
+        The `table.wikitable` element.
+
+    Returns
+    -------
+    : typing.List[typing.Tuple[float, float, int]]
+        Latitude, longitude, and land (`1`) or sea (`2`) status of each row.
+    """
+    rows = []
+    for row in table.iter("tr"):
+        try:
+            cell = next(row.iter("td"))
+            geo = cell.xpath(_geo)[0]
+            lat, lng = map(float, geo.xpath("string()").split(";"))
+            rows.append((lat, lng, 2 if "style" in cell.attrib else 1))
+        except (StopIteration, IndexError):
+            pass
+
+    return rows
+
+
+def extract_lxml(html: str) -> typing.List[typing.Tuple[float, float, int]]:
+    """Extract the rows of the first `table.wikitable` via `lxml`.
+
+    Parameters
+    ----------
+    html : str
+        HTML content of the page.
+
+    Returns
+    -------
+    : typing.List[typing.Tuple[float, float, int]]
+        Latitude, longitude, and land (`1`) or sea (`2`) status of each row.
+
+    Raises
+    ------
+    : IndexError
+        If no `table.wikitable` is found.
+    """
+    return _rows(lxml.html.document_fromstring(html).xpath(f"//table[{_wikitable}]")[0])
+
+
+def extract_lxml_stream(
+    html: str, chunk_size: int = 16384
+) -> typing.List[typing.Tuple[float, float, int]]:
+    """Extract the rows of the first `table.wikitable`, and stop parsing right after.
+
+    Parameters
+    ----------
+    html : str
+        HTML content of the page.
+    chunk_size : int
+        Number of characters fed to the parser at once. Defaults to `16384`.
+
+    Returns
+    -------
+    : typing.List[typing.Tuple[float, float, int]]
+        Latitude, longitude, and land (`1`) or sea (`2`) status of each row.
+
+    Raises
+    ------
+    : IndexError
+        If no `table.wikitable` is found.
+    """
+    parser = lxml.etree.HTMLPullParser(events=("start", "end"), tag="table")
+    table = None
+
+    for i in range(0, len(html), chunk_size):
+        parser.feed(html[i : i + chunk_size])
+
+        for event, element in parser.read_events():
+            if (
+                event == "start"
+                and table is None
+                and element.xpath(f"self::*[{_wikitable}]")
+            ):
+                table = element
+            elif event == "end" and element is table:
+                return _rows(table)
+
+    # unclosed table, or none at all
+    try:
+        parser.close()
+    except lxml.etree.XMLSyntaxError:
+        pass
+
+    if table is None:
+        raise IndexError("No table.wikitable found.")
+
+    return _rows(table)
+
+
+backends: typing.Dict[str, typing.Callable[[str], typing.List[typing.Tuple]]] = {
+    "bs4": extract_bs4,
+    "lxml": extract_lxml,
+    "lxml-stream": extract_lxml_stream,
+}
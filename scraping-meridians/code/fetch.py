@@ -0,0 +1,218 @@
+"""Concurrent, polite fetching of the Wikipedia pages.
+
+Downloading the 360 pages one after the other (with a random pause in between each)
+takes ages. Pages are here fetched by a pool of threads sharing:
+
+* a token bucket, limiting the number of requests per second sent to the website,
+* a `requests` session, keeping the connections alive (and pooled),
+* a retry policy, backing off exponentially on errors and `429` responses.
+
+Pages are handed over as soon as they are available, so that their parsing overlaps
+with the remaining downloads.
+
+A local stand-in for the website, serving saved `.html` files, is also available to
+test the whole pipeline offline:
+
+```python
+import fetch
+import svg
+
+server = fetch.serve_fixtures("fixtures")
+svg.wiki = f"http://localhost:{server.server_port}/wiki"
+```
+
+Attributes
+----------
+agent : str
+    `User-Agent` header sent along each request, as requested by Wikipedia.
+"""
+
+import concurrent.futures
+import hashlib
+import http.server
+import os
+import threading
+import time
+import typing
+
+import requests
+
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+agent: str = "scraping-meridians (https://github.com/carnarez/example-use-cases)"
+
+
+class TokenBucket:
+    """Rate limiter shared among threads.
+
+    Tokens are added at a constant rate, up to a maximum; each request consumes one,
+    and waits for it if none is left.
+
+    Attributes
+    ----------
+    rate : float
+        Number of tokens added per second.
+    burst : int
+        Maximum number of tokens available at once.
+    tokens : float
+        Number of tokens currently available.
+    """
+
+    def __init__(self, rate: float = 2.0, burst: int = 2):
+        """Fill up the bucket.
+
+        Parameters
+        ----------
+        rate : float
+            Number of tokens added per second. Defaults to `2.0`.
+        burst : int
+            Maximum number of tokens available at once. Defaults to `2`.
+        """
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Consume a token, waiting for one to be available if needed."""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self.tokens = min(
+                    self.burst, self.tokens + (now - self._last) * self.rate
+                )
+                self._last = now
+
+                if self.tokens >= 1.0:
+                    self.tokens -= 1.0
+                    return
+
+                wait = (1.0 - self.tokens) / self.rate
+
+            time.sleep(wait)
+
+
+def new_session(
+    workers: int = 4, retries: int = 5, backoff: float = 1.0
+) -> requests.Session:
+    """Prepare a session keeping its connections alive, and retrying failed requests.
+
+    Parameters
+    ----------
+    workers : int
+        Number of connections kept in the pool. Defaults to `4`.
+    retries : int
+        Maximum number of retries per request. Defaults to `5`.
+    backoff : float
+        Backoff factor between retries (`backoff * 2 ** (retry - 1)` seconds), unless
+        the server answers with a `Retry-After` header. Defaults to `1.0`.
+
+    Returns
+    -------
+    : requests.Session
+        Session to issue the requests from.
+    """
+    retry = Retry(
+        total=retries,
+        backoff_factor=backoff,
+        status_forcelist=[429, 500, 502, 503, 504],
+        allowed_methods=["GET"],
+        respect_retry_after_header=True,
+    )
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=workers, max_retries=retry)
+
+    session = requests.Session()
+    session.headers["User-Agent"] = agent
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+
+    return session
+
+
+def fetch_all(
+    urls: typing.List[str],
+    fetch: typing.Callable[[str], str],
+    workers: int = 4,
+) -> typing.Iterator[typing.Tuple[str, str]]:
+    """Fetch pages concurrently, and hand them over as soon as they are available.
+
+    Parameters
+    ----------
+    urls : typing.List[str]
+        The URLs of the pages to fetch.
+    fetch : typing.Callable[[str], str]
+        Function fetching a single page (see `svg.fetch_content()`).
+    workers : int
+        Number of threads fetching pages. Defaults to `4`.
+
+    Yields
+    ------
+    : str
+        URL of the page.
+    : str
+        HTML content of the page.
+    """
+    with concurrent.futures.ThreadPoolExecutor(workers) as executor:
+        futures = {executor.submit(fetch, url): url for url in urls}
+
+        for future in concurrent.futures.as_completed(futures):
+            yield futures[future], future.result()
+
+
+def serve_fixtures(folder: str, port: int = 0) -> http.server.ThreadingHTTPServer:
+    """Serve saved pages from a local folder, standing in for Wikipedia.
+
+    `GET /wiki/<name>` returns the content of `<folder>/<name>.html`, along with an
+    `ETag` header (`304 Not Modified` if it matches the `If-None-Match` header of the
+    request). The server runs in a background thread; call its `shutdown()` then
+    `server_close()` methods to stop it.
+
+    Parameters
+    ----------
+    folder : str
+        Path to the folder containing the `.html` files.
+    port : int
+        Port to listen to. Defaults to `0` (any available port, see the `server_port`
+        attribute of the returned server).
+
+    Returns
+    -------
+    : http.server.ThreadingHTTPServer
+        The running server.
+    """
+
+    class Handler(http.server.BaseHTTPRequestHandler):
+        def do_GET(self):
+            name = self.path.rsplit("/", 1)[-1]
+
+            try:
+                with open(os.path.join(folder, f"{name}.html"), "rb") as f:
+                    content = f.read()
+            except FileNotFoundError:
+                self.send_error(404)
+                return
+
+            etag = f'"{hashlib.sha1(content).hexdigest()}"'
+            if self.headers.get("If-None-Match") == etag:
+                self.send_response(304)
+                self.send_header("ETag", etag)
+                self.end_headers()
+                return
+
+            self.send_response(200)
+            self.send_header("ETag", etag)
+            self.send_header("Content-Type", "text/html; charset=utf-8")
+            self.send_header("Content-Length", str(len(content)))
+            self.end_headers()
+            self.wfile.write(content)
+
+        def log_message(self, *args):
+            pass
+
+    server = http.server.ThreadingHTTPServer(("localhost", port), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    return server
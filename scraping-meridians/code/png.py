@@ -0,0 +1,159 @@
+"""Raster backend: draw the map straight into a `PNG`, without going through `SVG`.
+
+A single point of each type (land or sea) is drawn (antialiased) into a small `RGBA`
+tile, and the map upsampled from the grid by looking up the tile of each point; the
+canvas is then written as a `PNG` file without any extra dependency. Same layout as the
+`SVG` plot (see `svg.render_plot()`).
+
+Run with:
+
+```bash
+$ .venv/bin/python code/svg.py png > map.png
+```
+"""
+
+import struct
+import typing
+import zlib
+
+import numpy as np
+
+
+def render_tile(
+    radius: int, margin: int, color: str, shape: str = "square", oversample: int = 4
+) -> np.array:
+    """Draw a single point into an `RGBA` tile.
+
+    Parameters
+    ----------
+    radius : int
+        Size of the point.
+    margin : int
+        Distance between points.
+    color : str
+        Colour of the point, as `#rrggbb`.
+    shape : str
+        Shape of the point, `square` (rounded corners) or `circle`. Defaults to
+        `square`.
+    oversample : int
+        Number of samples per pixel along each axis, to antialias the edges. Defaults
+        to `4`.
+
+    Returns
+    -------
+    : numpy.array
+        `NumPy` array (`uint8`) of shape `(radius + margin, radius + margin, 4)`, the
+        point in its top left corner.
+    """
+    shape = shape.lower()
+    if shape in ["s", "square"]:
+        rxy = radius * 0.25
+    elif shape in ["c", "circle"]:
+        rxy = radius * 0.5
+    else:
+        raise NotImplementedError(f'Shape "{shape}" is unknown.')
+
+    step = radius + margin
+
+    # distance of each sample to the rectangle shrunk by the corner radius
+    samples = (np.arange(step * oversample) + 0.5) / oversample
+    d = np.maximum(np.maximum(rxy - samples, samples - (radius - rxy)), 0.0)
+    inside = d[:, None] ** 2 + d[None, :] ** 2 <= rxy**2
+    inside &= (samples[:, None] < radius) & (samples[None, :] < radius)
+
+    coverage = inside.reshape(step, oversample, step, oversample).mean(axis=(1, 3))
+
+    tile: np.array = np.zeros((step, step, 4), dtype=np.uint8)
+    tile[..., :3] = [int(color[i : i + 2], 16) for i in (1, 3, 5)]
+    tile[..., 3] = np.round(coverage * 255)
+
+    return tile
+
+
+def render_canvas(
+    arr: np.array,
+    radius: int,
+    margin: int,
+    colors: typing.Dict[int, str] = {0: "#0969da", 1: "#39d353"},
+    shape: str = "square",
+) -> np.array:
+    """Draw the map into an `RGBA` canvas.
+
+    Parameters
+    ----------
+    arr : numpy.array
+        The array of data to process.
+    radius : int
+        Size of the points.
+    margin : int
+        Distance between points.
+    colors : typing.Dict[int, str]
+        Dictionary of colors for the two types of points. Defaults to
+        `{0: "#0969da", 1: "#39d353"}`.
+    shape : str
+        Shape of the points, `square` or `circle`. Defaults to `square`.
+
+    Returns
+    -------
+    : numpy.array
+        `NumPy` array (`uint8`) of shape `(height, width, 4)`.
+    """
+    step = radius + margin
+    nlat, nlng = arr.shape
+
+    for value in np.unique(arr).tolist():
+        if value not in colors:
+            raise KeyError(value)
+
+    # tile of each type of point, indexed by value
+    tiles: np.array = np.zeros((max(colors) + 1, step, step, 4), dtype=np.uint8)
+    for value, color in colors.items():
+        tiles[value] = render_tile(radius, margin, color, shape)
+
+    canvas: np.array = np.zeros(
+        (nlat * step + 2 * margin, nlng * step + 2 * margin, 4), dtype=np.uint8
+    )
+    canvas[margin : margin + nlat * step, margin : margin + nlng * step] = (
+        tiles[arr].transpose(0, 2, 1, 3, 4).reshape(nlat * step, nlng * step, 4)
+    )
+
+    return canvas
+
+
+def encode_png(canvas: np.array, level: int = 6) -> bytes:
+    """Encode an `RGBA` canvas as a `PNG` file.
+
+    A copy of `encode_png()` in `colourful-constants/code/raster.py`: the projects of
+    this repository are independent (no shared package to import it from), keep both in
+    sync.
+
+    Parameters
+    ----------
+    canvas : numpy.array
+        `NumPy` array (`uint8`) of shape `(height, width, 4)`.
+    level : int
+        `zlib` compression level. Defaults to `6`.
+
+    Returns
+    -------
+    : bytes
+        Content of the `PNG` file.
+    """
+    ny, nx, _ = canvas.shape
+
+    def chunk(kind: bytes, data: bytes) -> bytes:
+        crc = zlib.crc32(data, zlib.crc32(kind))
+        return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", crc)
+
+    # each scanline is prefixed by its filter type (0, none)
+    rows: np.array = np.zeros((ny, nx * 4 + 1), dtype=np.uint8)
+    rows[:, 1:] = canvas.reshape((ny, nx * 4))
+
+    return b"".join(
+        [
+            b"\x89PNG\r\n\x1a\n",
+            chunk(b"IHDR", struct.pack(">IIBBBBB", nx, ny, 8, 6, 0, 0, 0)),
+            chunk(b"IDAT", zlib.compress(rows.tobytes(), level)),
+            chunk(b"IEND", b""),
+        ]
+    )
@@ -0,0 +1,338 @@
+"""Reproject the dataset to other map projections.
+
+The dataset is a plain equirectangular grid. For each pixel of the target raster, the
+inverse projection gives the coordinates it shows, hence the cell of the grid to read
+(or none, outside the map): these indices only depend on the projection, the size of
+the raster and the shape of the grid, and are computed once and cached. Reprojecting
+any grid of the same shape is then a single gather of its cells.
+
+Available projections:
+
+* `mercator`: cut at about 85° of latitude (square map),
+* `robinson`: from the table of the original publication (linear interpolation),
+* `orthographic`: the globe seen from space, centered on `lat0` and `lng0`.
+
+Run with (from the folder containing the dataset):
+
+```bash
+$ .venv/bin/python code/projection.py 1 robinson 1024 > map.png
+```
+
+for the dataset of resolution `1`, reprojected to a `1024` pixels wide `PNG`.
+
+Attributes
+----------
+projections : typing.Dict[str, typing.Tuple[typing.Callable, typing.Tuple[float, ...]]]
+    Inverse projection function and extent (`xmin, xmax, ymin, ymax`, in projected
+    units) of each projection, indexed by name.
+"""
+
+import functools
+import sys
+import typing
+
+import numpy as np
+
+import api
+import png
+
+# robinson table: length of the parallels, and distance to the equator, every 5°
+_robinson_lat = np.radians(np.arange(0, 95, 5))
+_robinson_x = np.array(
+    [
+        1.0000,
+        0.9986,
+        0.9954,
+        0.9900,
+        0.9822,
+        0.9730,
+        0.9600,
+        0.9427,
+        0.9216,
+        0.8962,
+        0.8679,
+        0.8350,
+        0.7986,
+        0.7597,
+        0.7186,
+        0.6732,
+        0.6213,
+        0.5722,
+        0.5322,
+    ]
+)
+_robinson_y = np.array(
+    [
+        0.0000,
+        0.0620,
+        0.1240,
+        0.1860,
+        0.2480,
+        0.3100,
+        0.3720,
+        0.4340,
+        0.4958,
+        0.5571,
+        0.6176,
+        0.6769,
+        0.7346,
+        0.7903,
+        0.8435,
+        0.8936,
+        0.9394,
+        0.9761,
+        1.0000,
+    ]
+)
+
+
+def _mercator(x: np.array, y: np.array) -> typing.Tuple[np.array, np.array]:
+    """Inverse Mercator projection.
+
+    Parameters
+    ----------
+    x : numpy.array
+        Projected abscissae.
+    y : numpy.array
+        Projected ordinates.
+
+    Returns
+    -------
+    : numpy.array
+        Latitudes, in radians.
+    : numpy.array
+        Longitudes, in radians.
+    """
+    return np.arctan(np.sinh(y)), x
+
+
+def _robinson(x: np.array, y: np.array) -> typing.Tuple[np.array, np.array]:
+    """Inverse Robinson projection.
+
+    Parameters
+    ----------
+    x : numpy.array
+        Projected abscissae.
+    y : numpy.array
+        Projected ordinates.
+
+    Returns
+    -------
+    : numpy.array
+        Latitudes, in radians (`NaN` outside the map).
+    : numpy.array
+        Longitudes, in radians (`NaN` outside the map).
+    """
+    v = np.abs(y) / 1.3523
+    lat = np.copysign(np.interp(v, _robinson_y, _robinson_lat), y)
+    lng = x / (0.8487 * np.interp(np.abs(lat), _robinson_lat, _robinson_x))
+
+    outside = (v > 1.0) | (np.abs(lng) > np.pi)
+
+    return np.where(outside, np.nan, lat), np.where(outside, np.nan, lng)
+
+
+def _orthographic(
+    x: np.array, y: np.array, lat0: float = 0.0, lng0: float = 0.0
+) -> typing.Tuple[np.array, np.array]:
+    """Inverse orthographic projection.
+
+    Parameters
+    ----------
+    x : numpy.array
+        Projected abscissae.
+    y : numpy.array
+        Projected ordinates.
+    lat0 : float
+        Latitude of the center of the view, in degrees. Defaults to `0.0`.
+    lng0 : float
+        Longitude of the center of the view, in degrees. Defaults to `0.0`.
+
+    Returns
+    -------
+    : numpy.array
+        Latitudes, in radians (`NaN` outside the globe).
+    : numpy.array
+        Longitudes, in radians (`NaN` outside the globe).
+    """
+    lat0, lng0 = np.radians(lat0), np.radians(lng0)
+
+    rho = np.hypot(x, y)
+    c = np.arcsin(np.minimum(rho, 1.0))
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        lat = np.arcsin(
+            np.cos(c) * np.sin(lat0)
+            + np.where(rho > 0, y * np.sin(c) * np.cos(lat0) / rho, 0.0)
+        )
+    lng = lng0 + np.arctan2(
+        x * np.sin(c), rho * np.cos(c) * np.cos(lat0) - y * np.sin(c) * np.sin(lat0)
+    )
+
+    # back to [-pi, pi)
+    lng = (lng + np.pi) % (2 * np.pi) - np.pi
+
+    outside = rho > 1.0
+
+    return np.where(outside, np.nan, lat), np.where(outside, np.nan, lng)
+
+
+projections: typing.Dict[
+    str, typing.Tuple[typing.Callable, typing.Tuple[float, ...]]
+] = {
+    "mercator": (_mercator, (-np.pi, np.pi, -np.pi, np.pi)),
+    "robinson": (
+        _robinson,
+        (-0.8487 * np.pi, 0.8487 * np.pi, -1.3523, 1.3523),
+    ),
+    "orthographic": (_orthographic, (-1.0, 1.0, -1.0, 1.0)),
+}
+
+
+def raster_size(projection: str, width: int) -> typing.Tuple[int, int]:
+    """Size of the raster fitting a projection, for a given width.
+
+    Parameters
+    ----------
+    projection : str
+        Name of the projection.
+    width : int
+        Width of the raster, in pixels.
+
+    Returns
+    -------
+    : typing.Tuple[int, int]
+        Height and width of the raster, in pixels.
+    """
+    xmin, xmax, ymin, ymax = projections[projection][1]
+
+    return int(round(width * (ymax - ymin) / (xmax - xmin))), width
+
+
+@functools.lru_cache(maxsize=32)
+def inverse_index(
+    projection: str,
+    shape: typing.Tuple[int, int],
+    raster: typing.Tuple[int, int],
+    **params: float,
+) -> np.array:
+    """Map each pixel of the raster to the cell of the grid it shows.
+
+    The projection is fitted (centered, aspect ratio preserved) into the raster. The
+    result is cached per projection, grid shape, raster size and parameters.
+
+    Parameters
+    ----------
+    projection : str
+        Name of the projection.
+    shape : typing.Tuple[int, int]
+        Shape of the grid to reproject.
+    raster : typing.Tuple[int, int]
+        Height and width of the raster, in pixels.
+    **params : float
+        Extra parameters of the projection (_e.g._, `lat0` and `lng0`).
+
+    Returns
+    -------
+    : numpy.array
+        Read-only `NumPy` array of shape `raster`: flat index of the cell of the grid
+        shown by each pixel, `-1` outside the map.
+    """
+    inverse, (xmin, xmax, ymin, ymax) = projections[projection]
+    ny, nx = raster
+
+    # projected coordinates of the center of each pixel
+    scale = max((xmax - xmin) / nx, (ymax - ymin) / ny)
+    x = (np.arange(nx) + 0.5 - nx / 2) * scale + (xmin + xmax) / 2
+    y = (ny / 2 - np.arange(ny) - 0.5) * scale + (ymin + ymax) / 2
+
+    lat, lng = inverse(x[None, :], y[:, None], **params)
+    lat, lng = np.broadcast_arrays(np.degrees(lat), np.degrees(lng))
+
+    inside = np.isfinite(lat) & np.isfinite(lng)
+    inside &= (np.abs(lat) <= 90.0) & (np.abs(lng) <= 180.0)
+
+    rows, cols = api.locate(
+        np.where(inside, lat, 0.0), np.where(inside, lng, 0.0), shape
+    )
+
+    index = np.where(inside, rows * shape[1] + cols, -1)
+    index.setflags(write=False)
+
+    return index
+
+
+def reproject(
+    arr: np.array,
+    projection: str,
+    raster: typing.Tuple[int, int],
+    fill: int = -1,
+    **params: float,
+) -> np.array:
+    """Reproject a grid.
+
+    Parameters
+    ----------
+    arr : numpy.array
+        The grid to reproject.
+    projection : str
+        Name of the projection.
+    raster : typing.Tuple[int, int]
+        Height and width of the raster, in pixels.
+    fill : int
+        Value of the pixels outside the map. Defaults to `-1`.
+    **params : float
+        Extra parameters of the projection (_e.g._, `lat0` and `lng0`).
+
+    Returns
+    -------
+    : numpy.array
+        `NumPy` array of shape `raster`.
+    """
+    index = inverse_index(projection, arr.shape, tuple(raster), **params)
+
+    # index -1 picks the fill value, appended last
+    return np.append(arr.ravel(), np.array(fill, dtype=arr.dtype))[index]
+
+
+def render_canvas(
+    arr: np.array,
+    projection: str,
+    raster: typing.Tuple[int, int],
+    colors: typing.Dict[int, str] = {0: "#0969da", 1: "#39d353"},
+    **params: float,
+) -> np.array:
+    """Reproject a grid into an `RGBA` canvas (transparent outside the map).
+
+    Parameters
+    ----------
+    arr : numpy.array
+        The grid to reproject.
+    projection : str
+        Name of the projection.
+    raster : typing.Tuple[int, int]
+        Height and width of the raster, in pixels.
+    colors : typing.Dict[int, str]
+        Dictionary of colors for the two types of points. Defaults to
+        `{0: "#0969da", 1: "#39d353"}`.
+    **params : float
+        Extra parameters of the projection (_e.g._, `lat0` and `lng0`).
+
+    Returns
+    -------
+    : numpy.array
+        `NumPy` array (`uint8`) of shape `(height, width, 4)`.
+    """
+    # colour of each value, transparent last
+    palette: np.array = np.zeros((max(colors) + 2, 4), dtype=np.uint8)
+    for value, color in colors.items():
+        palette[value] = [int(color[i : i + 2], 16) for i in (1, 3, 5)] + [255]
+
+    return palette[reproject(arr, projection, raster, -1, **params)]
+
+
+if __name__ == "__main__":
+    land = np.load(f"dataset-{sys.argv[1]}.npy", mmap_mode="r")
+    raster = raster_size(sys.argv[2], int(sys.argv[3]))
+
+    sys.stdout.buffer.write(png.encode_png(render_canvas(land, sys.argv[2], raster)))
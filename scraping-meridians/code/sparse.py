@@ -0,0 +1,285 @@
+"""Sparse storage of the dataset: the filled meridians, run-length encoded.
+
+Only the 360 meridian columns of the grid are ever observed; all the other cells are
+copied from them (see `svg.approximate_unknown()`). Once its latitudes filled up, each
+meridian is nothing more than a handful of runs of land or sea: the whole dataset, at
+any resolution, is stored as the first row and status of each run (tens of kB), and
+materialized on demand, a block of rows at a time:
+
+```python
+import sparse
+import svg
+
+extracted = svg.pages.get_rows(svg.pages.urls())
+runs = sparse.encode({url: rows for url, (_, rows) in extracted.items()}, size=64)
+
+for start, block in sparse.blocks(runs, packed=True):
+    ...
+```
+
+Materialized rows are either dense (`int8`, one byte per cell), or bit-packed (one bit
+per cell, land set, eight cells per byte along the longitudes); the latter can be
+written to (and memory-mapped from) a `.npy` file without ever holding the dense grid
+in memory, _e.g._ 33MB instead of 265MB at resolution `64`.
+
+`svg.update_dataset()` stores the encoded meridians next to the dense dataset
+(`dataset-{size}.npz`), and builds the latter from them when starting from scratch;
+`api.load_grids()` falls back to them when the dense dataset is not around.
+"""
+
+import typing
+
+import numpy as np
+import numpy.lib.format
+
+import cells
+
+
+class Runs(typing.NamedTuple):
+    """Run-length encoded meridians.
+
+    Attributes
+    ----------
+    starts : numpy.array
+        First row of each run, meridian after meridian.
+    values : numpy.array
+        Land (`1`) or sea (`0`) status of each run.
+    offsets : numpy.array
+        Index of the first run of each meridian (plus the total number of runs).
+    size : int
+        Resolution of the grid.
+    """
+
+    starts: np.array
+    values: np.array
+    offsets: np.array
+    size: int
+
+    @property
+    def shape(self) -> typing.Tuple[int, int]:
+        """Shape of the materialized grid."""
+        return 180 * self.size, 360 * self.size
+
+
+def encode(extracted: typing.Dict[str, np.array], size: int) -> Runs:
+    """Encode the extracted rows, at a given resolution.
+
+    Same filling as `svg.observe()` then `svg.approximate_unknown()`: the rows of all
+    pages are replayed in order of URL (the last value written to a cell winning), the
+    first row is sea, and each observed value holds until the next one down the
+    meridian.
+
+    Parameters
+    ----------
+    extracted : typing.Dict[str, numpy.array]
+        Rows extracted from each page (see `cache.PageCache.get_rows()`), indexed by
+        URL.
+    size : int
+        Resolution of the grid.
+
+    Returns
+    -------
+    : Runs
+        The encoded meridians.
+    """
+    nlat = 180 * size
+
+    rows = np.concatenate(
+        [np.empty((0, 3))] + [extracted[u] for u in sorted(extracted)]
+    )
+    latth, lngth = cells.indices(rows, size)
+
+    # observed cells of the meridians; only water up there
+    keep = (latth > 0) & (lngth >= 0) & (lngth % size == 0)
+    cell = (lngth[keep] // size * nlat + latth[keep])[::-1]
+    value = rows[keep, 2][::-1].astype(np.uint8)
+
+    # last write wins, sorted by meridian then row
+    cell, last = np.unique(cell, return_index=True)
+    cell = np.concatenate([np.arange(360) * nlat, cell])
+    value = np.concatenate([np.full(360, 2, dtype=np.uint8), value[last]])
+
+    order = np.argsort(cell, kind="stable")
+    meridian, row = np.divmod(cell[order], nlat)
+    value = value[order]
+
+    # a run starts with each meridian, and with each change of value
+    start: np.array = np.ones(len(row), dtype=bool)
+    start[1:] = (meridian[1:] != meridian[:-1]) | (value[1:] != value[:-1])
+
+    return Runs(
+        row[start].astype(np.uint32),
+        (value[start] == 1).astype(np.uint8),
+        np.searchsorted(meridian[start], np.arange(361)),
+        size,
+    )
+
+
+def meridians(runs: Runs, start: int = 0, stop: int = None) -> np.array:
+    """Materialize rows of the filled meridians.
+
+    Parameters
+    ----------
+    runs : Runs
+        The encoded meridians.
+    start : int
+        First row to materialize. Defaults to `0`.
+    stop : int
+        Row to stop at (excluded). Defaults to `None` (last row).
+
+    Returns
+    -------
+    : numpy.array
+        `NumPy` array (`int8`) of shape `(stop - start, 360)`.
+    """
+    nlat = 180 * runs.size
+    stop = nlat if stop is None else min(stop, nlat)
+
+    # each run ends where the next one (of the same meridian) starts
+    ends = np.append(runs.starts[1:], 0).astype(np.int64)
+    ends[runs.offsets[1:] - 1] = nlat
+
+    lengths = np.clip(ends, start, stop) - np.clip(runs.starts, start, stop)
+
+    return np.repeat(runs.values.view(np.int8), lengths).reshape(360, stop - start).T
+
+
+def materialize(
+    runs: Runs, start: int = 0, stop: int = None, packed: bool = False
+) -> np.array:
+    """Materialize rows of the grid.
+
+    Parameters
+    ----------
+    runs : Runs
+        The encoded meridians.
+    start : int
+        First row to materialize. Defaults to `0`.
+    stop : int
+        Row to stop at (excluded). Defaults to `None` (last row).
+    packed : bool
+        Whether to pack the cells as bits, eight per byte along the longitudes.
+        Defaults to `False`.
+
+    Returns
+    -------
+    : numpy.array
+        `NumPy` array (`int8`) of shape `(stop - start, 360 * size)`, or (`uint8`) of
+        shape `(stop - start, ceil(360 * size / 8))` if packed.
+    """
+    size = runs.size
+
+    # meridian each column takes its values from (see svg.approximate_meridians())
+    half = max(size // 2, 1)
+    column = np.arange(360 * size)
+    source = (column // size + (column % size >= half)) % 360
+
+    arr = meridians(runs, start, stop)[:, source]
+
+    return np.packbits(arr, axis=1) if packed else arr
+
+
+def blocks(
+    runs: Runs, rows: int = 1024, packed: bool = False
+) -> typing.Iterator[typing.Tuple[int, np.array]]:
+    """Materialize the grid lazily, a block of rows at a time.
+
+    Parameters
+    ----------
+    runs : Runs
+        The encoded meridians.
+    rows : int
+        Number of rows per block. Defaults to `1024`.
+    packed : bool
+        Whether to pack the cells as bits (see `materialize()`). Defaults to `False`.
+
+    Yields
+    ------
+    : int
+        First row of the block.
+    : numpy.array
+        Materialized rows.
+    """
+    for start in range(0, runs.shape[0], rows):
+        yield start, materialize(runs, start, start + rows, packed)
+
+
+def save(runs: Runs, filename: str):
+    """Save the encoded meridians.
+
+    Parameters
+    ----------
+    runs : Runs
+        The encoded meridians.
+    filename : str
+        Filepath to the `.npz` file.
+    """
+    np.savez_compressed(
+        filename,
+        starts=runs.starts,
+        values=runs.values,
+        offsets=runs.offsets,
+        size=runs.size,
+    )
+
+
+def load(filename: str) -> Runs:
+    """Load encoded meridians.
+
+    Parameters
+    ----------
+    filename : str
+        Filepath to the `.npz` file.
+
+    Returns
+    -------
+    : Runs
+        The encoded meridians.
+    """
+    with np.load(filename) as f:
+        return Runs(f["starts"], f["values"], f["offsets"], int(f["size"]))
+
+
+def save_packed(runs: Runs, filename: str, rows: int = 1024):
+    """Write the bit-packed grid to a `.npy` file, a block of rows at a time.
+
+    Parameters
+    ----------
+    runs : Runs
+        The encoded meridians.
+    filename : str
+        Filepath to the `.npy` file.
+    rows : int
+        Number of rows per block. Defaults to `1024`.
+    """
+    nlat, nlng = runs.shape
+
+    packed = numpy.lib.format.open_memmap(
+        filename, mode="w+", dtype=np.uint8, shape=(nlat, (nlng + 7) // 8)
+    )
+
+    for start, block in blocks(runs, rows, packed=True):
+        packed[start : start + len(block)] = block
+
+    packed.flush()
+
+
+def unpack(packed: np.array, start: int = 0, stop: int = None) -> np.array:
+    """Unpack rows of a bit-packed grid (_e.g._, memory-mapped from a `.npy` file).
+
+    Parameters
+    ----------
+    packed : numpy.array
+        The bit-packed grid, of resolution `size`: `180 * size` rows, of
+        `45 * size` bytes.
+    start : int
+        First row to unpack. Defaults to `0`.
+    stop : int
+        Row to stop at (excluded). Defaults to `None` (last row).
+
+    Returns
+    -------
+    : numpy.array
+        `NumPy` array (`int8`) of shape `(stop - start, 360 * size)`.
+    """
+    return np.unpackbits(packed[start:stop], axis=1).view(np.int8)
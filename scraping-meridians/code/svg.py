@@ -1,6 +1,18 @@
-"""Scrape meridian data from Wikipedia and build the dataset."""
+"""Scrape meridian data from Wikipedia and build the dataset.
 
-import random
+Run with:
+
+```bash
+$ python3 -m venv .venv
+$ .venv/bin/pip install --no-cache-dir -r code/requirements.txt
+$ .venv/bin/python code/svg.py > map.svg
+```
+
+or `code/svg.py png > map.png` for a raster version of the map (see `png`).
+"""
+
+import hashlib
+import io
 import string
 import sys
 import time
@@ -9,13 +21,23 @@ import typing
 import numpy as np
 import requests
 
-from bs4 import BeautifulSoup
+import cache
+import extract
+import fetch
+import cells
+import png
+import sparse
 
 size: int = 1
 
 grid: typing.Tuple[int, int] = (45, 90)
-land: np.array = np.zeros((180 * size, 360 * size), dtype=np.int8)
 wiki: str = "https://en.wikipedia.org/wiki"
+backend: str = "lxml-stream"
+
+bucket: fetch.TokenBucket = fetch.TokenBucket(rate=2.0, burst=2)
+session: requests.Session = fetch.new_session(workers=4)
+pages: cache.PageCache = cache.PageCache("pages.sqlite")
+max_age: float = 7 * 24 * 3600.0
 
 svg: string.Template = string.Template(
     '<?xml version="1.0" encoding="utf-8" ?>\n'
@@ -26,7 +48,6 @@ svg: string.Template = string.Template(
     'xmlns:ev="http://www.w3.org/2001/xml-events" '
     'xmlns:xlink="http://www.w3.org/1999/xlink"'
     ">"
-    "<defs />"
     "$plot"
     "</svg>"
 )
@@ -88,94 +109,149 @@ def _nth(lat: float, lng: float) -> typing.List[int]:
     return list(map(lambda x: int(round(x * size, 0)), (lat, lng)))
 
 
-def fetch_content(url: str) -> str:
+def _urls() -> typing.List[str]:
+    """List the URLs of all the meridian pages.
+
+    Returns
+    -------
+    : typing.List[str]
+        The URLs of the pages.
+    """
+    urls = [f"{wiki}/IERS_Reference_Meridian", f"{wiki}/180th_meridian"]
+
+    for i in range(1, 180):
+        urls.append(f"{wiki}/{_ith(i)}_meridian_east")
+        urls.append(f"{wiki}/{_ith(i)}_meridian_west")
+
+    return urls
+
+
+def fetch_content(url: str, page: cache.Page = None) -> str:
     """Fetch the content to be scraped.
 
-    If the content is not found in the current folder, fetch it from Wikipedia and save
-    it for later use, to avoid pinging the website constantly (and potentially get
-    banned). Make sure the `.html` files are in the `.gitignore`!
+    Pages are kept in a local store (see `cache.PageCache`), to avoid pinging the
+    website constantly (and potentially get banned). Pages fetched less than `max_age`
+    seconds ago are read from the store as is; older ones are revalidated with a
+    conditional request, and only downloaded again if they changed. Should the website
+    be unreachable, the stored page is used anyway.
+
+    Requests go through the shared (keep-alive, retrying) session, and wait for a token
+    of the shared bucket to keep the rate of requests polite; this function can be
+    called from several threads at once.
 
     Parameters
     ----------
     url : str
         The URL of the page to fetch.
+    page : cache.Page
+        Stored page, if already looked up. Defaults to `None` (looked up in the store).
 
     Returns
     -------
     : str
         HTML content to be scraped.
     """
-    filename = f'{url.replace(f"{wiki}/", "")}.html'
+    if page is None:
+        page = pages.get(url)
 
-    try:
-        with open(filename, "r") as f:
-            html = f.read()
-        sys.stderr.write(f'Reading local "{filename}"\n')
+    if page is not None and time.time() - page.fetched < max_age:
+        sys.stderr.write(f'Reading cached "{url}"\n')
+        return page.content
 
-    except FileNotFoundError:
-        html = requests.get(url).content.decode()
+    headers = {}
+    if page is not None and page.etag is not None:
+        headers["If-None-Match"] = page.etag
+    if page is not None and page.modified is not None:
+        headers["If-Modified-Since"] = page.modified
 
-        with open(filename, "w") as f:
-            f.write(html)
+    bucket.acquire()
 
-        time.sleep(random.uniform(2.0, 5.0))  # for good measure
-        sys.stderr.write(f'Downloading "{url}"\n')
+    try:
+        response = session.get(url, headers=headers, timeout=30)
+    except requests.RequestException:
+        if page is None:
+            raise
+        sys.stderr.write(f'Reading stale "{url}"\n')
+        return page.content
+
+    if response.status_code == 304:
+        pages.touch(url)
+        sys.stderr.write(f'Revalidated "{url}"\n')
+        return page.content
+
+    response.raise_for_status()
+    html = response.content.decode()
+
+    pages.put(
+        url, html, response.headers.get("ETag"), response.headers.get("Last-Modified")
+    )
+    sys.stderr.write(f'Downloading "{url}"\n')
 
     return html
 
 
-def scrape_all(arr: np.array) -> np.array:
+def scrape_all(arr: np.array, workers: int = 4) -> np.array:
     """Scrape all involved pages.
 
+    Pages are fetched concurrently (see `fetch.fetch_all()`), and each one is parsed as
+    soon as it is available, while the others are still downloading.
+
     Parameters
     ----------
     arr : numpy.array
         The array to fill up with data (forwarded to `scrape_one()`).
+    workers : int
+        Number of threads fetching pages. Defaults to `4`.
 
     Returns
     -------
     : numpy.array
         Filled array.
     """
-    arr = scrape_one(f"{wiki}/IERS_Reference_Meridian", arr)
-    arr = scrape_one(f"{wiki}/180th_meridian", arr)
+    urls = _urls()
 
-    for i in range(1, 180):
-        arr = scrape_one(f"{wiki}/{_ith(i)}_meridian_east", arr)
-        arr = scrape_one(f"{wiki}/{_ith(i)}_meridian_west", arr)
+    # single lookup of all the stored pages
+    cached = pages.get_many(urls)
+
+    def fetch_one(url: str) -> str:
+        return fetch_content(url, cached.get(url))
+
+    for url, html in fetch.fetch_all(urls, fetch_one, workers):
+        arr = scrape_one(url, arr, html)
 
     return arr
 
 
-def scrape_one(url: str, arr: np.array) -> np.array:
+def scrape_one(url: str, arr: np.array, html: str = None) -> np.array:
     """Scrape a single page.
 
+    The rows of the page are extracted by the backend chosen via the `backend` module
+    attribute (see `extract.backends`).
+
     Parameters
     ----------
     url : str
         The URL of the page to scrape.
     arr : numpy.array
         The array to fill up with data.
+    html : str
+        HTML content of the page, if already fetched. Defaults to `None` (fetched via
+        `fetch_content()`).
 
     Returns
     -------
     : numpy.array
         Filled array.
     """
-    soup = BeautifulSoup(fetch_content(url), "html.parser")
+    if html is None:
+        html = fetch_content(url)
 
-    table = soup.select("table.wikitable")[0]
-    for row in table.select("tr"):
+    for lat, lng, lnd in extract.backends[backend](html):
         try:
-            cell = row.select("td")[0]
-
-            # fetch coordinates
-            lat, lng = map(float, cell.select("span.geo")[0].text.split(";"))
             latth, lngth = _nth(np.abs(lat - 90.0), lng + 180.0)
 
             # land (1) or sea (2), depending on table cell background colour
             # sea will be swapped to 0 in the next step
-            lnd = 2 if "style" in cell.attrs else 1
             arr[latth, lngth] = lnd
 
         except IndexError:
@@ -184,6 +260,77 @@ def scrape_one(url: str, arr: np.array) -> np.array:
     return arr
 
 
+def _indices(
+    rows: np.array, resolution: int = None
+) -> typing.Tuple[np.array, np.array]:
+    """Convert extracted rows to grid indices (see `cells.indices()`).
+
+    Parameters
+    ----------
+    rows : numpy.array
+        Extracted rows, as a `NumPy` array of shape `(n, 3)`.
+    resolution : int
+        Resolution of the grid. Defaults to `None` (`size` module attribute).
+
+    Returns
+    -------
+    : numpy.array
+        Row of each location, `-1` if out of the grid.
+    : numpy.array
+        Column of each location, `-1` if out of the grid.
+    """
+    return cells.indices(rows, size if resolution is None else resolution)
+
+
+def observe(
+    extracted: typing.Dict[str, np.array], meridians: np.array = None
+) -> np.array:
+    """Gather the observed values of some meridians from the extracted rows.
+
+    The rows of all pages are replayed in order of URL, the last value written to a
+    cell winning (as with `scrape_one()`).
+
+    Parameters
+    ----------
+    extracted : typing.Dict[str, numpy.array]
+        Rows extracted from each page (see `cache.PageCache.get_rows()`), indexed by
+        URL.
+    meridians : numpy.array
+        Indices of the meridians (`0` to `359`, from west to east, starting at
+        `180°W`) to gather. Defaults to `None` (all of them).
+
+    Returns
+    -------
+    : numpy.array
+        Land (`1`), sea (`2`) or unknown (`0`) status of the cells of each meridian, as
+        a `NumPy` array of shape `(nlat, len(meridians))`.
+    """
+    nlat, nlng = 180 * size, 360 * size
+
+    if meridians is None:
+        meridians = np.arange(360)
+
+    # position of each meridian column in the output, if gathered
+    position: np.array = np.full(nlng, -1, dtype=np.intp)
+    position[meridians * size] = np.arange(len(meridians))
+
+    rows = np.concatenate(
+        [np.empty((0, 3))] + [extracted[u] for u in sorted(extracted)]
+    )
+    latth, lngth = _indices(rows)
+    column = np.where(lngth >= 0, position[lngth], -1)
+    keep = (latth >= 0) & (column >= 0)
+
+    # last write wins
+    cell = (latth * len(meridians) + column)[keep][::-1]
+    _, last = np.unique(cell, return_index=True)
+
+    arr: np.array = np.zeros((nlat, len(meridians)), dtype=np.int8)
+    arr.flat[cell[last]] = rows[keep, 2][::-1][last]
+
+    return arr
+
+
 def approximate_unknown(arr: np.array) -> np.array:
     """If the array resolution is higher than the data, fill up the missing values.
 
@@ -199,84 +346,301 @@ def approximate_unknown(arr: np.array) -> np.array:
 
     Notes
     -----
-    All this could be done neater (and faster) with
-    [`numpy.convolve()`](https://numpy.org/doc/stable/reference/generated/numpy.convolve.html)
-    but keeping things as loops for clarity.
+    No loop over the cells: the latitudes are forward-filled using the running maximum
+    of the indices of the known values, and the longitudes filled one offset (from the
+    known meridian on the left) at a time, the first half of each block taking the
+    value of the meridian on its left, the second half the one on its right (periodic
+    boundary conditions).
     """
-    if len(np.where(arr == 0)[0]):
+    nlat, nlng = 180 * size, 360 * size
+
+    if np.any(arr == 0):
 
         # only water up there
         arr[0, :] = 2
 
         # first pass: approximate unknown latitudes
         # applied only on the known longitudes
-        for lng in range(0, 360 * size, size):
-            for lat in range(1, 180 * size):
-                if not arr[lat, lng]:
-                    arr[lat, lng] = arr[lat - 1, lng]
+        known = arr[:nlat, 0:nlng:size]
+        index = np.where(known != 0, np.arange(nlat)[:, None], 0)
+        np.maximum.accumulate(index, axis=0, out=index)
+        known[:] = np.take_along_axis(known, index, axis=0)
 
-    if len(np.where(arr == 0)[0]):
+    if np.any(arr == 0):
 
         # second pass: approximate unknown longitudes
-        for lat in range(1, 180 * size):
-            for lng in range(0, 360 * size, size):
-                curr_value = arr[lat, lng]
-
-                try:
-                    next_value = arr[lat, lng + size]
-                except IndexError:
-                    next_value = arr[lat, 0]
+        curr_value = arr[1:nlat, 0:nlng:size].copy()
+        next_value = np.roll(curr_value, -1, axis=1)
 
-                if curr_value == next_value:
-                    arr[lat, lng : lng + size] = curr_value
-                else:
-                    arr[lat, lng : lng + size // 2] = curr_value
-                    arr[lat, lng + size // 2 : lng + size] = next_value
+        for i in range(size):
+            arr[1:nlat, i:nlng:size] = curr_value if i < size // 2 else next_value
 
-    arr[np.where(arr == 2)] = 0  # sea is absence of land
+    arr[arr == 2] = 0  # sea is absence of land
 
     return arr
 
 
-def average_grid(arr: np.array) -> np.array:
+def integral_image(arr: np.array) -> np.array:
+    """Compute the summed-area table of an array.
+
+    Parameters
+    ----------
+    arr : numpy.array
+        The array of data to process.
+
+    Returns
+    -------
+    : numpy.array
+        `NumPy` array of shape `(nlat + 1, nlng + 1)`: sum of all the values above and
+        left of each position.
+    """
+    integral: np.array = np.zeros((arr.shape[0] + 1, arr.shape[1] + 1), dtype=np.int64)
+    np.cumsum(arr, axis=0, dtype=np.int64, out=integral[1:, 1:])
+    np.cumsum(integral[1:, 1:], axis=1, out=integral[1:, 1:])
+
+    return integral
+
+
+def average_grid(
+    arr: np.array,
+    shape: typing.Tuple[int, int] = None,
+    integral: np.array = None,
+) -> np.array:
     """Average to the chosen [smaller] grid size.
 
+    Each cell is the average of a window centered on it, read from the summed-area table
+    of the array in constant time. Longitudes wrap around (periodic boundary
+    conditions): a window overlapping the antimeridian sums whole turns of the table
+    plus the remainder.
+
     Parameters
     ----------
     arr : numpy.array
         The array to fill up with data (forwarded to `scrape_one()`).
+    shape : typing.Tuple[int, int]
+        Size of the grid to average to. Defaults to `None` (`grid` module attribute).
+    integral : numpy.array
+        Summed-area table of the array, to reuse it among grid sizes. Defaults to `None`
+        (computed via `integral_image()`).
 
     Returns
     -------
     : numpy.array
         Filled array.
     """
-    avg: np.array = np.zeros(grid, dtype=np.int8)
+    if shape is None:
+        shape = grid
+    if integral is None:
+        integral = integral_image(arr)
 
-    fx = 180 * size // grid[0]
-    fy = 360 * size // grid[1]
+    fx = 180 * size // shape[0]
+    fy = 360 * size // shape[1]
 
     hfx = fx // 2
     hfy = fy // 2
 
     nlat, nlng = arr.shape
 
-    # periodic boundary conditions
-    arr_pbc = np.hstack((arr[:, nlng - hfy : nlng], arr))
-    arr_pbc = np.hstack((arr_pbc, arr[:, 0:hfy]))
-
-    # averages
-    for lat in range(grid[0]):
-        for lng in range(grid[1]):
-            lat_min = 0 if lat * fx - hfx < 0 else lat * fx - hfx
-            lat_max = nlat if lat * fx + hfx >= nlat else lat * fx + hfx
-            lng_min = lng * fy
-            lng_max = lng * fy + 2 * hfy
-            avg[lat, lng] = int(
-                round(np.mean(arr_pbc[lat_min:lat_max, lng_min:lng_max]), 0)
-            )
+    # window boundaries
+    lat_min = np.clip(np.arange(shape[0]) * fx - hfx, 0, None)[:, None]
+    lat_max = np.clip(np.arange(shape[0]) * fx + hfx, None, nlat)[:, None]
+    lng_min = np.arange(shape[1]) * fy - hfy
+    lng_max = np.arange(shape[1]) * fy + hfy
+
+    def summed(lat: np.array, lng: np.array) -> np.array:
+        turns, lng = np.divmod(lng, nlng)
+        return turns * integral[lat, nlng] + integral[lat, lng]
+
+    total = (
+        summed(lat_max, lng_max)
+        - summed(lat_min, lng_max)
+        - summed(lat_max, lng_min)
+        + summed(lat_min, lng_min)
+    )
+    count = (lat_max - lat_min) * (lng_max - lng_min)
 
-    return avg
+    return np.round(total / count).astype(np.int8)
+
+
+def approximate_meridians(
+    dataset: np.array, observed: np.array, meridians: np.array
+) -> np.array:
+    """Fill up the columns of the dataset depending on some meridians only.
+
+    Same filling as `approximate_unknown()` (applied on the columns of the chosen
+    meridians, and on the columns between them and their neighbours taking their
+    values), assuming the grid has unknown values left.
+
+    Parameters
+    ----------
+    dataset : numpy.array
+        The (already filled) array to update, in place.
+    observed : numpy.array
+        Observed values of the meridians (see `observe()`).
+    meridians : numpy.array
+        Indices of the meridians.
+
+    Returns
+    -------
+    : numpy.array
+        Indices of the updated columns.
+    """
+    nlat, nlng = 180 * size, 360 * size
+
+    # first pass: only water up there, forward-filled latitudes
+    known = observed.copy()
+    known[0, :] = 2
+    index = np.where(known != 0, np.arange(nlat)[:, None], 0)
+    np.maximum.accumulate(index, axis=0, out=index)
+    known = np.take_along_axis(known, index, axis=0)
+
+    # second pass: the columns taking the values of each meridian, on both sides
+    half = max(size // 2, 1)
+    columns = (meridians[:, None] * size + np.arange(half - size, half)) % nlng
+
+    dataset[:, columns.ravel()] = np.where(known == 2, 0, known).repeat(size, axis=1)
+
+    return columns.ravel()
+
+
+def average_columns(
+    arr: np.array, columns: np.array, shape: typing.Tuple[int, int] = None
+) -> np.array:
+    """Average some columns of the chosen [smaller] grid only.
+
+    Same windows as `average_grid()`, summed straight from the columns of the array
+    they cover.
+
+    Parameters
+    ----------
+    arr : numpy.array
+        The array to average.
+    columns : numpy.array
+        Indices of the columns of the averaged grid to compute.
+    shape : typing.Tuple[int, int]
+        Size of the grid to average to. Defaults to `None` (`grid` module attribute).
+
+    Returns
+    -------
+    : numpy.array
+        Averaged columns, as a `NumPy` array of shape `(shape[0], len(columns))`.
+    """
+    if shape is None:
+        shape = grid
+
+    fx = 180 * size // shape[0]
+    fy = 360 * size // shape[1]
+
+    hfx = fx // 2
+    hfy = fy // 2
+
+    nlat, nlng = arr.shape
+
+    # window boundaries
+    lat_min = np.clip(np.arange(shape[0]) * fx - hfx, 0, None)[:, None]
+    lat_max = np.clip(np.arange(shape[0]) * fx + hfx, None, nlat)[:, None]
+    window = (np.asarray(columns)[:, None] * fy + np.arange(-hfy, hfy)) % nlng
+
+    integral: np.array = np.zeros((nlat + 1, len(columns)), dtype=np.int64)
+    np.cumsum(arr[:, window].sum(axis=2, dtype=np.int64), axis=0, out=integral[1:])
+
+    total = integral[lat_max.ravel()] - integral[lat_min.ravel()]
+    count = (lat_max - lat_min) * 2 * hfy
+
+    return np.round(total / count).astype(np.int8)
+
+
+def update_dataset(workers: int = 4) -> typing.Tuple[np.array, np.array]:
+    """Bring the dataset (and its averaged version) up to date, incrementally.
+
+    Pages are fetched (or revalidated) as usual, but only the pages whose content
+    changed since their last parsing are parsed again; the rows extracted from each
+    page are kept in the store. The columns of the dataset depending on the meridians
+    affected by the new rows, and the columns of the averaged grid covering them, are
+    then the only ones recomputed (the dataset is materialized from the run-length
+    encoded meridians if it does not exist yet, see `sparse`).
+
+    Both grids are saved (`dataset-{size}.npy` and `dataset-{size}-{nlat}x{nlng}.npy`),
+    along with the encoded meridians (`dataset-{size}.npz`).
+
+    Parameters
+    ----------
+    workers : int
+        Number of threads fetching pages. Defaults to `4`.
+
+    Returns
+    -------
+    : numpy.array
+        The dataset.
+    : numpy.array
+        The averaged dataset.
+    """
+    urls = _urls()
+
+    # single lookup of all the stored pages, and of their rows
+    cached = pages.get_many(urls)
+    extracted = pages.get_rows(urls)
+    affected = []
+
+    def fetch_one(url: str) -> str:
+        return fetch_content(url, cached.get(url))
+
+    for url, html in fetch.fetch_all(urls, fetch_one, workers):
+        digest = hashlib.sha1(html.encode()).hexdigest()
+        if url in extracted and extracted[url][0] == digest:
+            continue
+
+        rows = np.array(extract.backends[backend](html), dtype=np.float64)
+        rows = rows.reshape(-1, 3)
+        pages.put_rows(url, digest, rows)
+        sys.stderr.write(f'Parsed "{url}"\n')
+
+        # meridians written to by the former rows or the new ones
+        if url in extracted:
+            affected.append(extracted[url][1])
+        affected.append(rows)
+        extracted[url] = (digest, rows)
+
+    rows = {url: rows for url, (_, rows) in extracted.items()}
+
+    # the encoded meridians: tens of kB, whatever the resolution
+    runs = sparse.encode(rows, size)
+    sparse.save(runs, f"dataset-{size}.npz")
+
+    filename = f"dataset-{size}.npy"
+    try:
+        dataset = np.load(filename)
+    except FileNotFoundError:
+        dataset = sparse.materialize(runs)
+        columns = np.arange(dataset.shape[1])
+    else:
+        _, lngth = _indices(np.concatenate([np.empty((0, 3))] + affected))
+        meridians = np.unique(lngth[(lngth >= 0) & (lngth % size == 0)] // size)
+        columns = approximate_meridians(dataset, observe(rows, meridians), meridians)
+
+    np.save(filename, dataset)
+
+    if grid == dataset.shape:
+        return dataset, dataset
+
+    filename = f"dataset-{size}-{grid[0]}x{grid[1]}.npy"
+    try:
+        averaged = np.load(filename)
+
+        # averaged columns whose window covers an updated column
+        fy = 360 * size // grid[1]
+        window = np.arange(grid[1])[:, None] * fy + np.arange(-(fy // 2), fy // 2)
+        updated: np.array = np.zeros(dataset.shape[1], dtype=bool)
+        updated[columns] = True
+        changed = np.flatnonzero(updated[window % dataset.shape[1]].any(axis=1))
+
+        averaged[:, changed] = average_columns(dataset, changed)
+    except FileNotFoundError:
+        averaged = average_grid(dataset)
+
+    np.save(filename, averaged)
+
+    return dataset, averaged
 
 
 def render_plot(
@@ -288,6 +652,10 @@ def render_plot(
 ) -> str:
     """Generate the SVG plot.
 
+    Each point is drawn once, in a pattern per type of point (land or sea) defined up
+    front; horizontal runs of points of the same type are then drawn as a single
+    rectangle filled with the matching pattern, instead of one rectangle per point.
+
     Parameters
     ----------
     arr : numpy.array
@@ -305,7 +673,7 @@ def render_plot(
     Returns
     -------
     : str
-        All SVG objects concatenated as a string.
+        All SVG objects (pattern definitions included) concatenated as a string.
     """
     shape = styles.pop("shape", "square").lower()
     if shape in ["s", "square"]:
@@ -315,40 +683,66 @@ def render_plot(
     else:
         raise NotImplementedError(f'Shape "{shape}" is unknown.')
 
-    points = ""
+    step = radius + margin
     nlat, nlng = arr.shape
-    for lat in range(nlat):
-        for lng in range(nlng):
-            points += svg_point.substitute(
-                x=lng * (radius + margin) + margin,
-                y=lat * (radius + margin) + margin,
+
+    # start of each run: first column, or change of value from the left neighbour
+    starts: np.array = np.ones(arr.shape, dtype=bool)
+    starts[:, 1:] = arr[:, 1:] != arr[:, :-1]
+
+    lats, lngs = np.nonzero(starts)
+    lengths = np.diff(np.append(lats * nlng + lngs, nlat * nlng))
+    values = arr[lats, lngs]
+
+    for value in np.unique(values).tolist():
+        if value not in colors:
+            raise KeyError(value)
+
+    buffer = io.StringIO()
+
+    buffer.write("<defs>")
+    for value, color in colors.items():
+        buffer.write(
+            f'<pattern id="cell-{value}" x="{margin}" y="{margin}" '
+            f'width="{step}" height="{step}" patternUnits="userSpaceOnUse">'
+        )
+        buffer.write(
+            svg_point.substitute(
+                x=0,
+                y=0,
                 rx=rxy,
                 ry=rxy,
                 width=radius,
-                color=colors[arr[lat, lng]],
+                color=color,
                 style=" ".join([f'{k}="{v}"' for k, v in styles.items()]),
             )
+        )
+        buffer.write("</pattern>")
+    buffer.write("</defs>")
 
-    return points
+    for lat, lng, length, value in zip(
+        lats.tolist(), lngs.tolist(), lengths.tolist(), values.tolist()
+    ):
+        buffer.write(
+            f'<rect x="{lng * step + margin}" y="{lat * step + margin}" '
+            f'width="{length * step}" height="{step}" fill="url(#cell-{value})" />'
+        )
 
+    return buffer.getvalue()
 
-if __name__ == "__main__":
-    filename = f"dataset-{size}.npy"
 
-    try:
-        land = np.load(filename)
-    except FileNotFoundError:
-        land = scrape_all(land)
-        land = approximate_unknown(land)
-        np.save(filename, land)
-
-    if grid != (180 * size, 360 * size):
-        land = average_grid(land)
+if __name__ == "__main__":
+    _, land = update_dataset()
 
     radius = 8
     margin = 1
     nlat, nlng = land.shape
 
+    if sys.argv[1:] == ["png"]:
+        canvas = png.render_canvas(land, radius, margin, shape="circle")
+        sys.stdout.buffer.write(png.encode_png(canvas))
+        sys.exit()
+
     sys.stdout.write(
         svg.substitute(
             width=f"{nlng*(radius + margin) + 2*margin}px",